@@ -8,6 +8,7 @@ from langgraph.graph import StateGraph
 from qdrant_client.http.models import Filter
 from helpers.classes import ChatMessage, GraphState
 from helpers.model_loader import load_qdrant_client
+from helpers.icd11_catalog import load_catalog
 
 from typing import Dict, Any, ClassVar
 
@@ -26,6 +27,9 @@ TOP_K = 10
 # Instância única do cliente Qdrant (reutilizada em todo o tool)
 qdrant_client = load_qdrant_client()
 
+# Catálogo ICD-11 em memória para lookups por código (None => consulta o Qdrant)
+catalog = load_catalog()
+
 # Instância única do encoder de embeddings SentenceTransformer
 # (para CPU, pois toda a aplicação roda em CPU)
 embed_model = SentenceTransformer(
@@ -93,8 +97,15 @@ class QdrantRetrievalTool(BaseTool):
                 if rel:
                     related_codes.add(rel.strip())
 
-        # 3) Busca extensões para leaf_related_codes
+        # 3) Busca extensões para leaf_related_codes, ranqueadas pelo vetor da query.
+        # Com o catálogo local, só os códigos que são extensões vão para o filtro
+        # (e a busca é pulada quando não há nenhum)
         extension_hits_related = []
+        if related_codes and catalog is not None:
+            related_codes = {
+                rel for rel in related_codes
+                if (entry := catalog.get(rel)) is not None and entry.code_type == "extension"
+            }
         if related_codes:
             extension_hits_related = qdrant_client.query_points(
                 collection_name=COLLECTION,
@@ -127,7 +138,7 @@ class QdrantRetrievalTool(BaseTool):
         seen_ext_codes = set()
         extension_options = []
         def add_extensions(hits_list):
-            for hit in hits_list.points:
+            for hit in getattr(hits_list, "points", hits_list):
                 payload = hit.payload or {}
                 code = payload.get("code", "").strip()
                 title = payload.get("title", payload.get("concept_name", "")).strip()
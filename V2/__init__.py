@@ -1,10 +1,11 @@
 from langgraph.graph import StateGraph
 from langchain.tools import BaseTool
-from langchain_community.chat_models import ChatLlamaCpp
 from sentence_transformers import SentenceTransformer
 from qdrant_client.http.models import Filter
 
 from helpers.model_loader import load_qdrant_client
+from helpers.llm_registry import LLMHandle, llm_registry
+from helpers.icd11_catalog import load_catalog
 from helpers.classes import ChatMessage, GraphState
 from typing import Dict, Any, ClassVar
 
@@ -23,6 +24,9 @@ TOP_K = 7
 # Instância única do cliente Qdrant (reutilizada em todo o tool)
 qdrant_client = load_qdrant_client()
 
+# Catálogo ICD-11 em memória para lookups por código (None => consulta o Qdrant)
+catalog = load_catalog()
+
 # Instância única do encoder de embeddings SentenceTransformer
 # (para CPU, pois toda a aplicação roda em CPU)
 embed_model = SentenceTransformer(
@@ -90,8 +94,15 @@ class QdrantRetrievalTool(BaseTool):
                 if rel:
                     related_codes.add(rel.strip())
 
-        # 3) Busca extensões para leaf_related_codes
+        # 3) Busca extensões para leaf_related_codes, ranqueadas pelo vetor da query.
+        # Com o catálogo local, só os códigos que são extensões vão para o filtro
+        # (e a busca é pulada quando não há nenhum)
         extension_hits_related = []
+        if related_codes and catalog is not None:
+            related_codes = {
+                rel for rel in related_codes
+                if (entry := catalog.get(rel)) is not None and entry.code_type == "extension"
+            }
         if related_codes:
             extension_hits_related = qdrant_client.query_points(
                 collection_name=COLLECTION,
@@ -124,7 +135,7 @@ class QdrantRetrievalTool(BaseTool):
         seen_ext_codes = set()
         extension_options = []
         def add_extensions(hits_list):
-            for hit in hits_list.points:
+            for hit in getattr(hits_list, "points", hits_list):
                 payload = hit.payload or {}
                 code = payload.get("code", "").strip()
                 title = payload.get("title", payload.get("concept_name", "")).strip()
@@ -172,14 +183,16 @@ class ICD11MappingTool(BaseTool):
         "tags de pós-coordenação ou explicações."
     )
 
-    # Instanciaremos um ChatLlamaCpp por classe (pode-se ajustar para reuse global se desejar)
-    llm: ClassVar[ChatLlamaCpp] = ChatLlamaCpp(
-        model_path=GGUF_MODEL_PATH,
-        max_tokens=1536, 
-        temperature=0.2,
-        n_ctx=1536,
-        verbose=True
-    )
+    @property
+    def llm_handle(self) -> LLMHandle:
+        # Modelo compartilhado do processo (registro de LLMs), carregado na primeira chamada e não no import
+        return llm_registry.llama_cpp(
+            GGUF_MODEL_PATH,
+            max_tokens=1536,
+            temperature=0.2,
+            n_ctx=1536,
+            verbose=True,
+        )
 
     def _run(self, args: Dict[str, Any]) -> str:
         # args deve conter 'context' e 'concept'
@@ -200,8 +213,8 @@ class ICD11MappingTool(BaseTool):
             f"{context} [/INST]"
         )
 
-        # Invoca o ChatLlamaCpp para gerar a resposta
-        output = self.llm.invoke(prompt)
+        # Invoca o ChatLlamaCpp para gerar a resposta (uma chamada por vez no modelo compartilhado)
+        output = self.llm_handle.invoke(prompt)
         return output.content.strip()
 
     def _arun(self, args: Dict[str, Any]) -> str:
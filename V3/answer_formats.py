@@ -0,0 +1,95 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+# Rótulos da checagem de especificidade
+SPECIFICITY_LABELS = ("NARROWER-THAN", "BROADER-THAN", "SAME-AS")
+# Códigos de um cluster (stem + extensões) unidos por & ou /
+MAX_CLUSTER_CODES = 4
+
+
+class AnswerFormat(NamedTuple):
+    """
+    Formato da resposta de um tool de LLM: gramática GBNF para o llama.cpp
+    local (resposta crua, ex.: ``SAME-AS``) e JSON schema para a API
+    (``{"<field>": ...}``). A geração para assim que a resposta é válida,
+    então ``max_tokens`` só precisa cobrir a resposta. ``pattern`` é a regex
+    da resposta crua, usada para validar o que sai do modelo ou do cache.
+    """
+
+    name: str
+    gbnf: str
+    field: str
+    json_schema: dict
+    max_tokens: int
+    pattern: str
+
+
+def _one_of(values) -> str:
+    return " | ".join(f'"{value}"' for value in values)
+
+
+SPECIFICITY_FORMAT = AnswerFormat(
+    name="specificity_label",
+    gbnf=f"root ::= {_one_of(SPECIFICITY_LABELS)}\n",
+    field="label",
+    json_schema={
+        "type": "object",
+        "properties": {"label": {"type": "string", "enum": list(SPECIFICITY_LABELS)}},
+        "required": ["label"],
+        "additionalProperties": False,
+    },
+    max_tokens=8,
+    pattern="|".join(re.escape(label) for label in SPECIFICITY_LABELS),
+)
+
+# Stem (ex.: 1A00, BA00.Z, 2C25.01) ou extensão (ex.: XH7SY5, XS8H)
+_STEM_PATTERN = r"[0-9A-Z][A-Z][0-9][0-9A-Z](\.[0-9A-Z]{1,2})?"
+_EXTENSION_PATTERN = r"X[0-9A-Z]{3,5}"
+_CODE_PATTERN = f"({_STEM_PATTERN}|{_EXTENSION_PATTERN})"
+_CLUSTER_PATTERN = f"{_CODE_PATTERN}([&/]{_CODE_PATTERN}){{0,{MAX_CLUSTER_CODES - 1}}}"
+
+ICD11_CODE_FORMAT = AnswerFormat(
+    name="icd11_code",
+    gbnf=(
+        f"root ::= code ([&/] code){{0,{MAX_CLUSTER_CODES - 1}}}\n"
+        "code ::= stem | extension\n"
+        'stem ::= [0-9A-Z] [A-Z] [0-9] [0-9A-Z] ("." [0-9A-Z] [0-9A-Z]?)?\n'
+        'extension ::= "X" [0-9A-Z] [0-9A-Z] [0-9A-Z] [0-9A-Z]? [0-9A-Z]?\n'
+    ),
+    field="code",
+    json_schema={
+        "type": "object",
+        "properties": {
+            "code": {
+                "type": "string",
+                "pattern": f"^{_CLUSTER_PATTERN}$",
+            }
+        },
+        "required": ["code"],
+        "additionalProperties": False,
+    },
+    max_tokens=32,
+    pattern=_CLUSTER_PATTERN,
+)
+
+
+def is_valid_answer(answer_format: AnswerFormat, content: str) -> bool:
+    """A resposta crua está no formato (rótulo conhecido / código ou cluster bem formado)."""
+    return re.fullmatch(answer_format.pattern, content) is not None
+
+
+@lru_cache(maxsize=None)
+def llama_grammar(gbnf: str):
+    """``LlamaGrammar`` compilada uma vez por gramática."""
+    from llama_cpp import LlamaGrammar
+
+    return LlamaGrammar.from_string(gbnf, verbose=False)
+
+
+def response_format(answer_format: AnswerFormat) -> dict:
+    """``response_format`` (structured outputs) da API compatível com OpenAI."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": answer_format.name, "strict": True, "schema": answer_format.json_schema},
+    }
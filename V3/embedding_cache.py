@@ -0,0 +1,187 @@
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """Normalização da chave: remove espaços nas pontas e colapsa espaços internos."""
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """
+    Cache de embeddings em dois níveis:
+    - L1: LRU em memória, por processo
+    - L2: SQLite opcional em disco, sobrevive a restarts e é compartilhado entre workers
+
+    As chaves são (model_key, texto normalizado). O ``model_key`` inclui um
+    fingerprint do encoder, então workers com encoders diferentes dividem o
+    mesmo SQLite sem se invalidar. No disco, linhas não usadas há mais de
+    ``ttl`` segundos expiram na abertura; ``purge`` remove por idade ou por
+    fingerprint (helpers/embedding_cache_admin.py).
+    """
+
+    def __init__(self, max_entries: int = 4096, disk_path: Optional[str] = None, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.ttl = ttl
+        self._lru: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS embeddings (
+                    model_key TEXT NOT NULL,
+                    uri TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (model_key, text_hash)
+                )"""
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(embeddings)")}
+            if "last_used" not in columns:
+                # Cache criado antes da expiração por idade: as linhas contam a partir de agora
+                self._db.execute("ALTER TABLE embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+                self._db.execute("UPDATE embeddings SET last_used = ?", (time.time(),))
+            self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self._db.commit()
+            if ttl:
+                deleted = self.purge(max_age=ttl)
+                if deleted:
+                    print(f"🧹 Embedding cache: dropped {deleted} vectors unused for {ttl / 86400:.0f} days")
+
+    @staticmethod
+    def _text_hash(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def register_model(self, uri: str, model_key: str) -> None:
+        """
+        Tira do LRU deste processo as entradas de ``uri`` de outros fingerprints.
+        No disco elas ficam (outro worker pode usar aquele encoder) até expirar.
+        """
+        with self._lock:
+            for key in [k for k in self._lru if k[0].startswith(f"{uri}@") and k[0] != model_key]:
+                del self._lru[key]
+
+    def purge(self, max_age: Optional[float] = None, model_keys: Optional[Iterable[str]] = None) -> int:
+        """
+        Remove do disco as linhas não usadas há mais de ``max_age`` segundos
+        e/ou as dos fingerprints em ``model_keys``; retorna quantas saíram.
+        """
+        if self._db is None:
+            return 0
+        conditions, params = [], []
+        if max_age is not None:
+            conditions.append("last_used < ?")
+            params.append(time.time() - max_age)
+        model_keys = list(model_keys or [])
+        if model_keys:
+            conditions.append(f"model_key IN ({', '.join('?' * len(model_keys))})")
+            params.extend(model_keys)
+        if not conditions:
+            return 0
+        with self._lock:
+            deleted = self._db.execute(f"DELETE FROM embeddings WHERE {' OR '.join(conditions)}", params).rowcount
+            self._db.commit()
+            for key in [k for k in self._lru if k[0] in model_keys]:
+                del self._lru[key]
+        return deleted
+
+    def fingerprints(self) -> List[Tuple[str, str, int, float]]:
+        """(model_key, uri, linhas, último uso) de cada fingerprint no disco."""
+        if self._db is None:
+            return []
+        with self._lock:
+            return self._db.execute(
+                "SELECT model_key, uri, COUNT(*), MAX(last_used) FROM embeddings "
+                "GROUP BY model_key, uri ORDER BY uri, MAX(last_used) DESC"
+            ).fetchall()
+
+    def get_or_compute(
+        self, model_key: str, uri: str, text: str, compute: Callable[[str], np.ndarray]
+    ) -> np.ndarray:
+        text = normalize_text(text)
+        key = (model_key, text)
+
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return vector
+
+        vector = self._disk_get(model_key, text)
+        if vector is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._lru_put(key, vector)
+            return vector
+
+        vector = np.asarray(compute(text), dtype=np.float32)
+        with self._lock:
+            self.misses += 1
+        self._lru_put(key, vector)
+        self._disk_put(model_key, uri, text, vector)
+        return vector
+
+    def _lru_put(self, key: Tuple[str, str], vector: np.ndarray) -> None:
+        with self._lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def _disk_get(self, model_key: str, text: str) -> Optional[np.ndarray]:
+        if self._db is None:
+            return None
+        text_hash = self._text_hash(text)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT vector, last_used FROM embeddings WHERE model_key = ? AND text_hash = ?",
+                (model_key, text_hash),
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            # Marca o uso no máximo uma vez por hora por linha (evita uma escrita por leitura)
+            if now - row[1] > 3600:
+                self._db.execute(
+                    "UPDATE embeddings SET last_used = ? WHERE model_key = ? AND text_hash = ?",
+                    (now, model_key, text_hash),
+                )
+                self._db.commit()
+        return np.frombuffer(row[0], dtype=np.float32).copy()
+
+    def _disk_put(self, model_key: str, uri: str, text: str, vector: np.ndarray) -> None:
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO embeddings (model_key, uri, text_hash, vector, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (model_key, uri, self._text_hash(text), vector.tobytes(), time.time()),
+            )
+            self._db.commit()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._lru),
+            }
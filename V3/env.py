@@ -1,7 +1,15 @@
 from langgraph.graph import StateGraph
 from V3.classes import GraphState
-from helpers.model_loader import load_qdrant_client
-from sentence_transformers import SentenceTransformer
+from helpers.model_loader import load_async_qdrant_client, load_qdrant_client
+from helpers.icd11_catalog import load_catalog
+from helpers.encoders import load_encoder
+from helpers.qdrant_config import search_params
+from V3.embedding_cache import EmbeddingCache
+from V3.index_version import IndexVersion
+from V3.llm_response_cache import LLMResponseCache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import hashlib
 import torch
 import os
 
@@ -18,21 +26,108 @@ device = "cuda" if torch.cuda.is_available() else "cpu"
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 OPENROUTER_MODEL = "meta-llama/llama-4-scout:free"
 
+# Backend dos tools de LLM: "openrouter", "llama-server" ou "llama-cpp" (em
+# processo). Vazio escolhe pela configuração: OpenRouter com chave, o servidor
+# com LLAMA_SERVER_URL, senão o GGUF em processo.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "")
+# llama.cpp server local (helpers/llama_server.py), API compatível com OpenAI
+LLAMA_SERVER_URL = os.getenv("LLAMA_SERVER_URL", "")
+LLAMA_SERVER_MODEL = os.getenv("LLAMA_SERVER_MODEL", os.path.basename(GGUF_MODEL_PATH))
+# Slots paralelos do servidor (--parallel); também é o tamanho do pool HTTP
+LLAMA_SERVER_SLOTS = int(os.getenv("LLAMA_SERVER_SLOTS", "4"))
+LLAMA_SERVER_TIMEOUT = float(os.getenv("LLAMA_SERVER_TIMEOUT", "120"))
+
+# Cache em disco dos estados KV dos prefixos fixos dos prompts (instruções +
+# few-shot) no llama.cpp local; vazio desativa
+LLAMA_PREFIX_CACHE_DIR = os.getenv("LLAMA_PREFIX_CACHE_DIR", "./cache/llama_prefix")
+LLAMA_PREFIX_CACHE_MB = int(os.getenv("LLAMA_PREFIX_CACHE_MB", "4096"))
+
+# Cache persistente das respostas dos tools de LLM (SQLite, compartilhado entre
+# workers); chamadas cacheadas usam amostragem determinística. Vazio desativa
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./cache/llm_responses.sqlite")
+llm_response_cache = (
+    LLMResponseCache(
+        LLM_CACHE_PATH,
+        max_bytes=int(os.getenv("LLM_CACHE_MB", "256")) << 20,
+        ttl=float(os.getenv("LLM_CACHE_TTL_HOURS", "168")) * 3600,
+    )
+    if LLM_CACHE_PATH
+    else None
+)
+
+# Cache de embeddings: LRU em memória + SQLite opcional compartilhado entre workers.
+# Vetores sem uso há EMBEDDING_CACHE_TTL_DAYS dias saem do disco (0 = nunca)
+EMBEDDING_CACHE_TTL_DAYS = float(os.getenv("EMBEDDING_CACHE_TTL_DAYS", "30"))
+embedding_cache = EmbeddingCache(
+    max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "4096")),
+    disk_path=os.getenv("EMBEDDING_CACHE_PATH") or None,
+    ttl=EMBEDDING_CACHE_TTL_DAYS * 86400 or None,
+)
+
+
+# Backend do encoder: "torch", "onnx", "onnx-int8" ou "fastembed" (helpers/encoders.py).
+# Pode ser sobrescrito por coleção, ex.: ENCODER_BACKEND_SAPBERT=onnx-int8
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "torch")
+
+
 class Collection:
-    def __init__(self, name: str, uri: str):
+    def __init__(self, name: str, uri: str, backend: str = None):
         self.name = name
         self.uri = uri
+        self.backend = backend or os.getenv(
+            f"ENCODER_BACKEND_{name.rsplit('_', 1)[-1].upper()}", ENCODER_BACKEND
+        )
         self.model = self.generate_model()
+        self.cache_key = f"{self.uri}@{self.fingerprint()}"
+        embedding_cache.register_model(self.uri, self.cache_key)
 
     def generate_model(self):
-        return SentenceTransformer(self.uri, device=device)
+        print(f"📥 Loading encoder {self.uri} [{self.backend}]")
+        return load_encoder(self.uri, self.backend, device)
 
-    def embed(self, text: str):
+    def fingerprint(self) -> str:
+        """Identifica o encoder carregado; muda se o backend, a arquitetura ou os pesos mudarem."""
+        digest = hashlib.sha1(f"{self.backend}|{self.model!r}".encode("utf-8"))
+        parameters = list(self.model.parameters()) if hasattr(self.model, "parameters") else []
+        for parameter in parameters[:2] + parameters[-2:]:
+            digest.update(parameter.detach().flatten()[:4096].cpu().numpy().tobytes())
+        return digest.hexdigest()[:16]
+
+    def encode(self, text: str):
         return self.model.encode(
             text, convert_to_numpy=True, normalize_embeddings=True
+        )
+
+    @property
+    def vector_name(self) -> str:
+        """Nome do vetor deste encoder na coleção multi-vetor (ex.: "mpnet")."""
+        return self.name.rsplit("_", 1)[-1]
+
+    def embed(self, text: str):
+        return embedding_cache.get_or_compute(
+            self.cache_key, self.uri, text, self.encode
         ).tolist()
 
 
+class MultiVectorCollection:
+    """
+    Coleção única com um named vector por encoder e payload compartilhado
+    (``populate_qdrant.py --multivector``); a fusão é feita no servidor.
+    """
+
+    def __init__(self, name: str, encoders: List[Collection]):
+        self.name = name
+        self.encoders = encoders
+
+    def embed(self, text: str) -> Dict[str, List[float]]:
+        if CONCURRENT_RETRIEVAL:
+            with ThreadPoolExecutor(max_workers=len(self.encoders)) as pool:
+                vectors = list(pool.map(lambda c: c.embed(text), self.encoders))
+        else:
+            vectors = [c.embed(text) for c in self.encoders]
+        return {c.vector_name: v for c, v in zip(self.encoders, vectors)}
+
+
 collections = [
     Collection("icd11_concepts_mpnet", "sentence-transformers/all-mpnet-base-v2"),
     Collection("icd11_concepts_biobert", "pritamdeka/S-BioBert-snli-multinli-stsb"),
@@ -41,9 +136,71 @@ collections = [
     ),
 ]
 
+# Com MULTIVECTOR_COLLECTION, cada passe de retrieval é uma única requisição
+# (prefetch por named vector + RRF no servidor) em vez de uma por coleção
+MULTIVECTOR_COLLECTION = os.getenv("MULTIVECTOR_COLLECTION", "")
+retrieval_targets = (
+    [MultiVectorCollection(MULTIVECTOR_COLLECTION, collections)]
+    if MULTIVECTOR_COLLECTION
+    else collections
+)
+
 
 TOP_K = 3
+# Fator de over-fetch por página: cada código tem vários pontos (sinônimos)
+RETRIEVAL_OVERFETCH = int(os.getenv("RETRIEVAL_OVERFETCH", "3"))
+# Pool de candidatos por coleção (x TOP_K) mantido no estado entre reinícios do looper
+RETRIEVAL_CANDIDATE_POOL = int(os.getenv("RETRIEVAL_CANDIDATE_POOL", "3"))
+# Busca agrupada por `code` (K códigos distintos em uma única requisição)
+GROUPED_SEARCH = os.getenv("GROUPED_SEARCH", "true").lower() in ("1", "true", "yes")
+# Quantos sinônimos por código são contados em cada grupo
+SYNONYM_GROUP_SIZE = int(os.getenv("SYNONYM_GROUP_SIZE", "5"))
+
+# Executa embed + busca de cada coleção em paralelo (torch libera o GIL)
+CONCURRENT_RETRIEVAL = os.getenv("CONCURRENT_RETRIEVAL", "true").lower() in ("1", "true", "yes")
+
+# Fusão dos rankings dos encoders: "rrf" ou "weighted"
+FUSION_MODE = os.getenv("FUSION_MODE", "rrf")
+FUSION_RRF_K = int(os.getenv("FUSION_RRF_K", "60"))
+# Pesos por coleção, ex.: "icd11_concepts_sapbert=1.5,icd11_concepts_mpnet=1"
+FUSION_WEIGHTS = {
+    name.strip(): float(weight)
+    for name, weight in (
+        pair.split("=") for pair in os.getenv("FUSION_WEIGHTS", "").split(",") if pair
+    )
+}
+
+# Armazenamento dos vetores das coleções (populate_qdrant.py --storage):
+# "float32", "float16", "int8" ou "binary". Nas quantizadas a busca usa
+# oversampling (0 => padrão do tipo) + rescore com os vetores originais
+QDRANT_STORAGE = os.getenv("QDRANT_STORAGE", "float32")
+# Perfil das coleções (populate_qdrant.py --profile): "default", "low-latency",
+# "memory-lean" ou "high-recall"; define o hnsw_ef das consultas (HNSW_EF sobrescreve)
+QDRANT_PROFILE = os.getenv("QDRANT_PROFILE", "default")
+SEARCH_PARAMS = search_params(
+    QDRANT_STORAGE,
+    oversampling=float(os.getenv("QUANTIZATION_OVERSAMPLING", "0")) or None,
+    rescore=os.getenv("QUANTIZATION_RESCORE", "true").lower() in ("1", "true", "yes"),
+    profile=QDRANT_PROFILE,
+    hnsw_ef=int(os.getenv("HNSW_EF", "0")) or None,
+)
 
 qdrant_client = load_qdrant_client()
+# Cliente assíncrono usado pelos tools quando o grafo roda no servidor LangGraph
+# (None nos backends embarcados, que caem no cliente síncrono em um executor)
+async_qdrant_client = load_async_qdrant_client()
+
+# Versão ativa do índice: coleções servidas pelos aliases consultados acima
+# (populate_qdrant.py publica versões novas trocando o alias). Reavaliada a
+# cada INDEX_VERSION_TTL segundos; entra na chave do pool de candidatos
+index_version = IndexVersion(
+    qdrant_client,
+    async_qdrant_client,
+    [target.name for target in retrieval_targets],
+    ttl=float(os.getenv("INDEX_VERSION_TTL", "30")),
+)
+
+# Catálogo em memória para lookups por código (None => consulta o Qdrant)
+catalog = load_catalog()
 
 builder = StateGraph(GraphState)
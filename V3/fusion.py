@@ -0,0 +1,66 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def fuse_rankings(
+    rankings: Dict[str, List[Tuple[str, float]]],
+    mode: str = "rrf",
+    rrf_k: int = 60,
+    weights: Optional[Dict[str, float]] = None,
+) -> List[dict]:
+    """
+    Funde as listas ranqueadas de cada encoder em um único ranking global.
+
+    Args:
+        rankings: nome da coleção -> [(code, score)] já ordenado pelo Qdrant.
+        mode: ``rrf`` (reciprocal-rank fusion) ou ``weighted`` (soma ponderada dos scores).
+        rrf_k: constante de suavização do RRF.
+        weights: peso por coleção (padrão 1.0).
+
+    Returns:
+        Lista de dicts ``{code, fused_score, scores, ranks}`` em ordem decrescente
+        de ``fused_score``. Empates mantêm a ordem de primeira aparição
+        (a mesma do merge serial por coleção).
+    """
+    names = list(rankings)
+    codes: Dict[str, int] = {}
+    for name in names:
+        for code, _ in rankings[name]:
+            codes.setdefault(code, len(codes))
+    if not codes:
+        return []
+
+    # Matrizes códigos x coleções; ausentes ficam com rank infinito / score NaN
+    ranks = np.full((len(codes), len(names)), np.inf)
+    scores = np.full((len(codes), len(names)), np.nan)
+    for j, name in enumerate(names):
+        if not rankings[name]:
+            continue
+        rows = np.fromiter((codes[code] for code, _ in rankings[name]), dtype=np.intp)
+        ranks[rows, j] = np.arange(1, len(rows) + 1)
+        scores[rows, j] = np.fromiter((score for _, score in rankings[name]), dtype=np.float64)
+
+    w = np.array([(weights or {}).get(name, 1.0) for name in names])
+    if mode == "rrf":
+        fused = (w / (rrf_k + ranks)).sum(axis=1)
+    elif mode == "weighted":
+        fused = (w * np.nan_to_num(scores, nan=0.0)).sum(axis=1) / w.sum()
+    else:
+        raise ValueError(f"Unknown fusion mode: {mode}")
+
+    order = np.argsort(-fused, kind="stable")
+    code_list = list(codes)
+    return [
+        {
+            "code": code_list[i],
+            "fused_score": float(fused[i]),
+            "scores": {
+                name: float(scores[i, j]) for j, name in enumerate(names) if np.isfinite(ranks[i, j])
+            },
+            "ranks": {
+                name: int(ranks[i, j]) for j, name in enumerate(names) if np.isfinite(ranks[i, j])
+            },
+        }
+        for i in order
+    ]
@@ -0,0 +1,68 @@
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+
+
+class IndexVersion:
+    """
+    Versão ativa do índice vetorial consultado pelo V3: as coleções reais por
+    trás dos aliases (blue/green, ``helpers/qdrant_config.py``). Muda quando o
+    populate publica uma versão nova ou quando há rollback; resultados derivados
+    do índice devem levar a versão na chave para serem invalidados.
+
+    A resolução dos aliases é uma requisição ao Qdrant, então o valor fica em
+    cache por ``ttl`` segundos. Backends sem aliases (índice NumPy) usam os
+    próprios nomes das coleções.
+    """
+
+    def __init__(self, client: Any, async_client: Any, names: List[str], ttl: float = 30.0):
+        self.client = client
+        self.async_client = async_client
+        self.names = list(names)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._collections: Optional[Dict[str, str]] = None
+        self._expires = 0.0
+
+    @property
+    def collections(self) -> Optional[Dict[str, str]]:
+        """alias -> coleção servida, da última resolução."""
+        return self._collections
+
+    @staticmethod
+    def key(collections: Dict[str, str]) -> str:
+        return hashlib.sha1(json.dumps(sorted(collections.items())).encode("utf-8")).hexdigest()[:12]
+
+    def _cached(self) -> Optional[str]:
+        with self._lock:
+            if self._collections is not None and time.monotonic() < self._expires:
+                return self.key(self._collections)
+        return None
+
+    def _store(self, aliases: Dict[str, str]) -> str:
+        collections = {name: aliases.get(name, name) for name in self.names}
+        with self._lock:
+            if self._collections is not None and collections != self._collections:
+                print(f"🔀 Index version changed: {self._collections} -> {collections}")
+            self._collections = collections
+            self._expires = time.monotonic() + self.ttl
+        return self.key(collections)
+
+    def value(self) -> str:
+        cached = self._cached()
+        if cached is not None:
+            return cached
+        if not hasattr(self.client, "get_aliases"):
+            return self._store({})
+        return self._store({a.alias_name: a.collection_name for a in self.client.get_aliases().aliases})
+
+    async def avalue(self) -> str:
+        cached = self._cached()
+        if cached is not None:
+            return cached
+        if self.async_client is None:
+            return self.value()
+        response = await self.async_client.get_aliases()
+        return self._store({a.alias_name: a.collection_name for a in response.aliases})
@@ -0,0 +1,160 @@
+import os
+import time
+import hashlib
+import threading
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+import llama_cpp
+from llama_cpp import Llama
+from llama_cpp.llama_cache import LlamaDiskCache
+
+
+def prefix_cache_dir(root: str, model_path: str, n_ctx: int) -> str:
+    """Diretório do cache de um modelo: estados KV só valem para o mesmo arquivo GGUF e n_ctx."""
+    stat = os.stat(model_path)
+    digest = hashlib.sha1(
+        f"{os.path.abspath(model_path)}|{stat.st_size}|{stat.st_mtime_ns}|{n_ctx}".encode("utf-8")
+    ).hexdigest()[:12]
+    return os.path.join(root, f"{os.path.basename(model_path)}-{digest}")
+
+
+class PrefixKVCache(LlamaDiskCache):
+    """
+    Cache em disco dos estados KV do llama.cpp por prefixo estático de prompt.
+
+    O ``Llama`` consulta o cache com os tokens do prompt e, no fim da chamada,
+    grava o estado de prompt + resposta. Aqui só o prefixo compartilhado fica
+    guardado: quando dois prompts têm um prefixo comum de pelo menos
+    ``min_prefix_tokens`` tokens (instruções + few-shot), o KV é cortado nesse
+    ponto e salvo com esse prefixo como chave. As próximas chamadas carregam o
+    estado e avaliam só o sufixo do conceito. Um acerto parcial (prefixo comum
+    menor que a chave) encurta a entrada, então ela converge para a parte fixa.
+
+    Diferente do ``LlamaDiskCache`` original, a leitura não remove a entrada, e
+    o diretório sobrevive a restarts. Por chamada, ``last_call`` guarda os
+    tokens pulados e o tempo de prefill economizado (estimado pela taxa de
+    prefill medida pelo próprio llama.cpp).
+    """
+
+    def __init__(
+        self,
+        llama: Llama,
+        cache_dir: str,
+        capacity_bytes: int = 2 << 30,
+        min_prefix_tokens: int = 32,
+    ):
+        super().__init__(cache_dir=cache_dir, capacity_bytes=capacity_bytes)
+        self.llama = llama
+        self.min_prefix_tokens = min_prefix_tokens
+        self._lock = threading.Lock()
+        # Prompts recentes sem prefixo guardado: o próximo prompt parecido define a parte fixa
+        self._recent: deque = deque(maxlen=8)
+        self._prompt: Optional[Tuple[int, ...]] = None
+        self._hit: Optional[Tuple[Tuple[int, ...], int]] = None
+        self._skipped = 0
+        self._perf_start: Tuple[float, int] = (0.0, 0)
+        self._started = 0.0
+        self.ms_per_token: Optional[float] = None
+        self.last_call: Dict[str, float] = {}
+        self.calls = 0
+        self.hits = 0
+        self.tokens_skipped = 0
+        self.ms_saved = 0.0
+
+    def _prompt_eval(self) -> Tuple[float, int]:
+        """(ms, tokens) de prefill acumulados no contexto do llama.cpp."""
+        perf = llama_cpp.llama_perf_context(self.llama._ctx.ctx)
+        return perf.t_p_eval_ms, perf.n_p_eval
+
+    def _find_longest_prefix_key(self, key: Tuple[int, ...]) -> Optional[Tuple[int, ...]]:
+        best_key, best_len = None, self.min_prefix_tokens - 1
+        for stored in self.cache.iterkeys():
+            prefix_len = Llama.longest_token_prefix(stored, key)
+            if prefix_len > best_len:
+                best_key, best_len = stored, prefix_len
+        return best_key
+
+    def __getitem__(self, key):
+        # Início de uma chamada: o Llama consulta o cache com os tokens do prompt
+        key = tuple(key)
+        with self._lock:
+            self._prompt = key
+            self.last_call = {}
+            self._started = time.perf_counter()
+            self._perf_start = self._prompt_eval()
+            # O Llama também reaproveita o que já está no contexto (prompt anterior);
+            # ``input_ids`` é o buffer de n_ctx, só os ``n_tokens`` primeiros valem
+            in_context = Llama.longest_token_prefix(self.llama._input_ids.tolist(), key)
+            stored = self._find_longest_prefix_key(key)
+            self._hit = None if stored is None else (stored, Llama.longest_token_prefix(stored, key))
+            # O último token do prompt é sempre reavaliado
+            self._skipped = min(max(in_context, self._hit[1] if self._hit else 0), len(key) - 1)
+        if stored is None:
+            raise KeyError("Key not found")
+        return self.cache[stored]
+
+    def __contains__(self, key):
+        return self._find_longest_prefix_key(tuple(key)) is not None
+
+    def __setitem__(self, key, value):
+        # Fim da chamada: ``value`` é o estado de prompt + resposta; guarda só o prefixo
+        with self._lock:
+            prompt, hit, self._prompt = self._prompt, self._hit, None
+            if prompt is None:
+                return
+            self._record_call(prompt)
+
+            if hit is not None:
+                stored, prefix_len = hit
+                if prefix_len == len(stored):
+                    return
+            else:
+                stored = None
+                prefix_len = max((Llama.longest_token_prefix(p, prompt) for p in self._recent), default=0)
+                self._recent.append(prompt)
+            # Nunca inclui o último token do prompt (ele é sempre reavaliado)
+            prefix_len = min(prefix_len, len(prompt) - 1)
+            if prefix_len < self.min_prefix_tokens:
+                return
+
+            # Corta o KV do contexto no fim do prefixo e salva só esse estado
+            self.llama._ctx.kv_cache_seq_rm(-1, prefix_len, -1)
+            self.llama.n_tokens = prefix_len
+            state = self.llama.save_state()
+            if stored is not None and stored in self.cache:
+                del self.cache[stored]
+            super().__setitem__(prompt[:prefix_len], state)
+            print(f"💾 KV prefix cache: stored a {prefix_len}-token prompt prefix ({self.cache_size / 2**20:.0f} MB on disk)")
+
+    def _record_call(self, prompt: Tuple[int, ...]) -> None:
+        t_ms, n_tokens = self._prompt_eval()
+        prefill_ms = t_ms - self._perf_start[0]
+        evaluated = n_tokens - self._perf_start[1]
+        if evaluated > 0:
+            rate = prefill_ms / evaluated
+            self.ms_per_token = rate if self.ms_per_token is None else 0.8 * self.ms_per_token + 0.2 * rate
+        saved = self._skipped * (self.ms_per_token or 0.0)
+        self.calls += 1
+        self.hits += self._skipped > 0
+        self.tokens_skipped += self._skipped
+        self.ms_saved += saved
+        self.last_call = {
+            "prompt_tokens": len(prompt),
+            "tokens_skipped": self._skipped,
+            "tokens_evaluated": evaluated,
+            "prefill_ms": prefill_ms,
+            "ms_saved": saved,
+            "call_ms": (time.perf_counter() - self._started) * 1000,
+        }
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hits": self.hits,
+                "tokens_skipped": self.tokens_skipped,
+                "ms_saved": self.ms_saved,
+                "entries": len(self.cache),
+                "disk_mb": self.cache_size / 2**20,
+            }
@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+# Amostragem fixa das chamadas cacheadas: greedy com seed fixa, então a mesma
+# chave sempre teria gerado a mesma resposta
+DETERMINISTIC_PARAMS = {"temperature": 0.0, "seed": 0}
+
+
+class LLMResponseCache:
+    """
+    Cache persistente (SQLite) das respostas dos tools de LLM, compartilhado
+    entre workers e restarts.
+
+    A chave é um hash de (modelo, prompt formatado, parâmetros de geração). O
+    modelo entra com a configuração do registro e, para GGUF, com tamanho e
+    mtime do arquivo, então trocar de modelo ou de backend não reaproveita
+    respostas. Entradas expiram após ``ttl`` segundos e, acima de
+    ``max_bytes``, as menos usadas recentemente saem primeiro.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 << 20, ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.ms_saved = 0.0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                reasoning TEXT NOT NULL,
+                generation_ms REAL NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._db.commit()
+        with self._lock:
+            self._drop_expired()
+
+    @staticmethod
+    def model_id(key: Tuple, model_path: Optional[str] = None) -> str:
+        """Identidade do modelo: chave do registro (backend, nome, parâmetros) + arquivo GGUF."""
+        model = json.dumps(key, default=str)
+        if model_path and os.path.exists(model_path):
+            stat = os.stat(model_path)
+            model += f"|{stat.st_size}|{stat.st_mtime_ns}"
+        return model
+
+    @staticmethod
+    def key(model: str, prompt: str, params: Dict[str, Any]) -> str:
+        payload = json.dumps([model, prompt, params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        """(content, reasoning) da chave, ou None (ausente ou expirada)."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content, reasoning, generation_ms, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[3] > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                self.expired += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            self.ms_saved += row[2]
+            return row[0], row[1]
+
+    def put(self, key: str, model: str, content: str, reasoning: str, generation_ms: float) -> None:
+        now = time.time()
+        size = len(key) + len(content.encode("utf-8")) + len(reasoning.encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, content, reasoning, generation_ms, size, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, content, reasoning, generation_ms, size, now, now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _drop_expired(self) -> None:
+        deleted = self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)).rowcount
+        self._db.commit()
+        if deleted:
+            print(f"🧹 LLM response cache: dropped {deleted} expired answers")
+
+    def _evict(self) -> None:
+        """Remove as entradas menos usadas recentemente até caber em ``max_bytes``."""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        keys = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            keys.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        self._db.executemany("DELETE FROM responses WHERE key = ?", keys)
+        self.evicted += len(keys)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "ms_saved": round(self.ms_saved),
+                "entries": entries,
+                "size_mb": round(size / 2**20, 2),
+            }
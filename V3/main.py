@@ -1,7 +1,10 @@
 from langgraph.graph import END
+from langchain_core.runnables import RunnableLambda
 from V3.nodes import (
     analysis_step_specificity_check,
+    aanalysis_step_specificity_check,
     step_001_retrieval_stem_codes,
+    astep_001_retrieval_stem_codes,
     step_002_exact_match_stem_code,
     step_003_llm_select_stem_code,
     final_looper,
@@ -58,10 +61,18 @@ def looper(state: GraphState) -> str:
         return "restart"
 
 # Add nodes
-builder.add_node("retrieve stem codes", step_001_retrieval_stem_codes)
+# Os nós que consultam o Qdrant têm variante async: graph.invoke usa a síncrona e o
+# servidor LangGraph (ainvoke/astream) usa a que fala com o AsyncQdrantClient
+builder.add_node(
+    "retrieve stem codes",
+    RunnableLambda(step_001_retrieval_stem_codes, afunc=astep_001_retrieval_stem_codes),
+)
 builder.add_node("compare exact stem concept match", step_002_exact_match_stem_code)
 builder.add_node("llm select stem code", step_003_llm_select_stem_code)
-builder.add_node("check concept specificity", analysis_step_specificity_check)
+builder.add_node(
+    "check concept specificity",
+    RunnableLambda(analysis_step_specificity_check, afunc=aanalysis_step_specificity_check),
+)
 builder.add_node("final looper", final_looper)
 
 # Entry point
@@ -1,14 +1,22 @@
 """Expose node callables for easy import in the graph builder."""
 
-from .analysis_step_specificity_check import analysis_step_specificity_check
-from .step_001_retrieval_stem_codes import step_001_retrieval_stem_codes
+from .analysis_step_specificity_check import (
+    analysis_step_specificity_check,
+    aanalysis_step_specificity_check,
+)
+from .step_001_retrieval_stem_codes import (
+    step_001_retrieval_stem_codes,
+    astep_001_retrieval_stem_codes,
+)
 from .step_002_exact_match_stem_code import step_002_exact_match_stem_code
 from .step_003_llm_select_stem_code import step_003_llm_select_stem_code
 from .final_looper import final_looper
 
 __all__ = [
     "analysis_step_specificity_check",
+    "aanalysis_step_specificity_check",
     "step_001_retrieval_stem_codes",
+    "astep_001_retrieval_stem_codes",
     "step_002_exact_match_stem_code",
     "step_003_llm_select_stem_code",
     "final_looper",
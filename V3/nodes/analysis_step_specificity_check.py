@@ -12,4 +12,19 @@ def analysis_step_specificity_check(state: GraphState) -> GraphState:
                 },
             ]
         }
-    )
\ No newline at end of file
+    )
+
+
+async def aanalysis_step_specificity_check(state: GraphState) -> GraphState:
+    """Async variant of ``analysis_step_specificity_check`` used by the LangGraph server."""
+    result: GraphState = await specificity_check_tool._arun(state)
+    return GraphStateManager(result).update(
+        {
+            "task_memory": [
+                {
+                    "name": "step",
+                    "content": "analysis_step_specificity_check",
+                },
+            ]
+        }
+    )
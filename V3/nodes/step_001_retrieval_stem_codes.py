@@ -35,3 +35,24 @@ def step_001_retrieval_stem_codes(state: GraphState) -> GraphState:
             ]
         }
     )
+
+
+async def astep_001_retrieval_stem_codes(state: GraphState) -> GraphState:
+    """Async variant of ``step_001_retrieval_stem_codes`` used by the LangGraph server."""
+    user_message = state.clinical_concept_input if state.clinical_concept_input else state.messages[-1].content
+    print(f"🔍 User message for retrieval: {user_message}")
+
+    sm = GraphStateManager(state)
+    result = await vector_database_retrieve_stem_codes._arun(
+        sm.update({"clinical_concept_input": user_message})
+    )
+    return GraphStateManager(result).update(
+        {
+            "task_memory": [
+                {
+                    "name": "step",
+                    "content": "step_001_retrieval_stem_codes",
+                }
+            ]
+        }
+    )
@@ -36,8 +36,12 @@ class ExactMatchStemCodeTool(BaseTool):
             if getattr(item, "name", None) == "blacklist_code"
         )
 
-        # filtrando stem_hits pelo blacklist_codes
-        stem_hits = [hit for hit in stem_hits if hit.get("code") not in blacklist_codes]
+        # filtrando stem_hits pelo blacklist_codes, na ordem do ranking fundido
+        # (o primeiro match exato já é o melhor candidato)
+        stem_hits = sorted(
+            (hit for hit in stem_hits if hit.get("code") not in blacklist_codes),
+            key=lambda hit: hit.get("rank", 0),
+        )
 
         if len(stem_hits) == 1:
             # Caso só tenha um stem hit, retorna ele
@@ -67,9 +71,11 @@ class ExactMatchStemCodeTool(BaseTool):
             # Normalize FSN and label: remove punctuation, lowercase, split into tokens
             raw_fsn = hit.get("fsn", "")
             raw_label = hit.get("label", "")
-            normalized_fsn = re.sub(r"[^\w\s]", "", raw_fsn.strip()).lower()
             normalized_label = re.sub(r"[^\w\s]", "", raw_label.strip()).lower()
-            fsn_tokens = normalized_fsn.split()
+            # Usa os tokens do FSN gravados na indexação quando disponíveis
+            fsn_tokens = hit.get("fsn_tokens")
+            if fsn_tokens is None:
+                fsn_tokens = re.sub(r"[^\w\s]", "", raw_fsn.strip()).lower().split()
             label_tokens = normalized_label.split()
 
             # Compare token sets (order-insensitive) against concept
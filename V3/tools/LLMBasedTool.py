@@ -1,15 +1,98 @@
 import re
+import json
+import time
 from langchain.tools import BaseTool
 from pydantic import PrivateAttr
-from typing import ClassVar, List, Tuple, Union, Any, Dict
+from typing import ClassVar, List, Optional, Tuple, Union, Any, Dict
 from langchain_community.chat_models import ChatLlamaCpp
 from langchain_openai import ChatOpenAI
-from V3.env import GGUF_MODEL_PATH, OPENROUTER_API_KEY, OPENROUTER_MODEL
+from V3.env import (
+    GGUF_MODEL_PATH,
+    OPENROUTER_API_KEY,
+    OPENROUTER_MODEL,
+    LLM_BACKEND,
+    LLAMA_SERVER_URL,
+    LLAMA_SERVER_MODEL,
+    LLAMA_SERVER_SLOTS,
+    LLAMA_SERVER_TIMEOUT,
+    LLAMA_PREFIX_CACHE_DIR,
+    LLAMA_PREFIX_CACHE_MB,
+    llm_response_cache,
+)
+from V3.answer_formats import AnswerFormat, is_valid_answer, llama_grammar, response_format
+from V3.llm_response_cache import DETERMINISTIC_PARAMS, LLMResponseCache
+from helpers.llm_registry import LLMHandle, llm_registry
+
+def install_prefix_cache(llm: ChatLlamaCpp) -> None:
+    """Instala (uma vez por modelo carregado) o cache KV em disco dos prefixos fixos dos prompts."""
+    if not LLAMA_PREFIX_CACHE_DIR:
+        return
+    from V3.llm_prefix_cache import PrefixKVCache, prefix_cache_dir
+
+    cache = PrefixKVCache(
+        llm.client,
+        prefix_cache_dir(LLAMA_PREFIX_CACHE_DIR, GGUF_MODEL_PATH, llm.n_ctx),
+        capacity_bytes=LLAMA_PREFIX_CACHE_MB << 20,
+    )
+    llm.client.set_cache(cache)
+    print(f"💾 KV prefix cache at {cache.cache.directory}: {cache.stats()}")
+
+
+LLM_BACKENDS = ("openrouter", "llama-server", "llama-cpp")
+
+
+def default_backend() -> str:
+    if LLM_BACKEND:
+        return LLM_BACKEND
+    if OPENROUTER_API_KEY:
+        return "openrouter"
+    if LLAMA_SERVER_URL:
+        return "llama-server"
+    return "llama-cpp"
+
+
+def load_llm_handle(backend: str) -> LLMHandle:
+    """Handle compartilhado (helpers/llm_registry.py) do backend pedido."""
+    if backend == "openrouter":
+        print("📥 Using OpenRouter LLM model with reasoning tokens...")
+        return llm_registry.openai(
+            OPENROUTER_MODEL,
+            openai_api_key=OPENROUTER_API_KEY,
+            openai_api_base="https://openrouter.ai/api/v1",
+            temperature=0.1,
+            max_tokens=2560,
+        )
+    if backend == "llama-server":
+        if not LLAMA_SERVER_URL:
+            raise ValueError("LLM_BACKEND=llama-server needs LLAMA_SERVER_URL (e.g. http://localhost:8080/v1)")
+        print(f"📥 Using llama.cpp server at {LLAMA_SERVER_URL} ({LLAMA_SERVER_SLOTS} slots)...")
+        return llm_registry.llama_server(
+            LLAMA_SERVER_URL,
+            LLAMA_SERVER_MODEL,
+            slots=LLAMA_SERVER_SLOTS,
+            timeout=LLAMA_SERVER_TIMEOUT,
+            max_tokens=8 * 512,
+            temperature=0.1,
+        )
+    if backend == "llama-cpp":
+        print("📥 Using local LlamaCpp model...")
+        return llm_registry.llama_cpp(
+            GGUF_MODEL_PATH,
+            setup=install_prefix_cache,
+            max_tokens=8 * 512,
+            temperature=0.1,
+            n_ctx=1536,
+            verbose=True,
+        )
+    raise ValueError(f"Unknown LLM backend: {backend} (expected one of {LLM_BACKENDS})")
+
 
 class ReasoningResponse:
-    def __init__(self, content: str, reasoning: str):
+    def __init__(self, content: str, reasoning: str, valid: bool = True):
         self.content = content
         self.reasoning = reasoning
+        # False quando a resposta saiu do formato pedido (não vai para o cache)
+        self.valid = valid
 
 class LLMBasedTool(BaseTool):
     name: ClassVar[str] = "llm_based_tool"
@@ -17,37 +100,116 @@ class LLMBasedTool(BaseTool):
         "Tool que usa OpenRouter (API) ou LlamaCpp local para comparar especificidade de conceitos médicos"
     )
 
-    _llm: Union[ChatLlamaCpp, ChatOpenAI] = PrivateAttr(default=None)
+    # Handle do modelo compartilhado por todos os tools do processo (helpers/llm_registry.py)
+    _handle: Optional[LLMHandle] = PrivateAttr(default=None)
+
+    # Backend escolhido para este tool (None: LLM_BACKEND / configuração)
+    _backend: Optional[str] = PrivateAttr(default=None)
+
+    def use_backend(self, backend: str) -> None:
+        """Troca o backend deste tool (ex.: benchmark); o modelo vem do registro."""
+        if backend not in LLM_BACKENDS:
+            raise ValueError(f"Unknown LLM backend: {backend} (expected one of {LLM_BACKENDS})")
+        self._backend = backend
+        self._handle = None
+
+    @property
+    def backend(self) -> str:
+        return self._backend or default_backend()
+
+    @property
+    def llm_handle(self) -> LLMHandle:
+        if self._handle is None:
+            self._handle = load_llm_handle(self.backend)
+        return self._handle
 
     @property
     def llm(self) -> Union[ChatLlamaCpp, ChatOpenAI]:
-        if self._llm is not None:
-            return self._llm
-
-        print("📥 Loading LLM model...")
-        if OPENROUTER_API_KEY:
-            print("📥 Loading OpenRouter LLM model with reasoning tokens...")
-            self._llm = ChatOpenAI(
-                openai_api_key=OPENROUTER_API_KEY,
-                openai_api_base="https://openrouter.ai/api/v1",
-                model_name=OPENROUTER_MODEL,
-                temperature=0.1,
-                max_tokens=2560
-            )
-        else:
-            print("📥 Loading local LlamaCpp model...")
-            self._llm = ChatLlamaCpp(
-                model_path=GGUF_MODEL_PATH,
-                max_tokens=8 * 512,
-                temperature=0.1,
-                n_ctx=1536,
-                verbose=True,
+        return self.llm_handle.model
+
+    @property
+    def prefix_cache(self) -> Any:
+        """Cache KV de prefixos instalado no llama.cpp local (None na API ou desativado)."""
+        cache = getattr(getattr(self.llm, "client", None), "cache", None)
+        return cache if hasattr(cache, "last_call") else None
+
+    def structured_kwargs(self, answer_format: AnswerFormat) -> Dict[str, Any]:
+        """Restringe a geração ao formato: GBNF no llama.cpp (local ou server), JSON schema na API."""
+        if self.backend == "llama-server":
+            # O llama.cpp server aceita a gramática no corpo da requisição
+            return {"extra_body": {"grammar": answer_format.gbnf}, "max_tokens": answer_format.max_tokens}
+        if isinstance(self.llm, ChatOpenAI):
+            return {"response_format": response_format(answer_format), "max_tokens": answer_format.max_tokens}
+        return {"grammar": llama_grammar(answer_format.gbnf), "max_tokens": answer_format.max_tokens}
+
+    def parse_structured(self, res: Any, answer_format: AnswerFormat) -> Tuple[str, bool]:
+        """
+        Resposta já no formato: crua no llama.cpp, campo do objeto JSON na API.
+        Retorna (resposta, veio no schema).
+        """
+        content = (res.content or "").strip()
+        if self.backend == "llama-server" or not isinstance(self.llm, ChatOpenAI):
+            return content, True
+        try:
+            return str(json.loads(content)[answer_format.field]).strip(), True
+        except (ValueError, KeyError, TypeError):
+            # Provedor que ignorou o schema: devolve o texto, o tool valida
+            print(f"⚠️ [{self.name}] Response outside the {answer_format.name} schema: {content!r}")
+            return content, False
+
+    def llm_invoke(
+        self, prompt: str, answer_format: Optional[AnswerFormat] = None, attempt: int = 0, **kwargs
+    ) -> ReasoningResponse:
+        """
+        ``attempt`` > 0 marca uma nova tentativa do mesmo prompt (a anterior foi
+        inconclusiva): não passa pelo cache e amostra com ``seed=attempt``, para
+        não repetir a mesma resposta.
+        """
+        if attempt:
+            return self._generate(prompt, answer_format, **{**kwargs, "seed": attempt})
+        if llm_response_cache is None:
+            return self._generate(prompt, answer_format, **kwargs)
+
+        # Respostas cacheadas só valem se a geração for determinística
+        kwargs = {**kwargs, **DETERMINISTIC_PARAMS}
+        model = LLMResponseCache.model_id(self.llm_handle.key, getattr(self.llm, "model_path", None))
+        params = {**kwargs, "answer_format": answer_format._asdict() if answer_format is not None else None}
+        key = LLMResponseCache.key(model, prompt, params)
+        cached = llm_response_cache.get(key)
+        if cached is not None:
+            print(f"♻️ LLM response cache hit [{self.name}]: {llm_response_cache.stats()}")
+            return ReasoningResponse(content=cached[0], reasoning=cached[1])
+
+        started = time.perf_counter()
+        response = self._generate(prompt, answer_format, **kwargs)
+        # Só guarda respostas no formato; fora dele o tool pede de novo
+        if response.valid and response.content:
+            llm_response_cache.put(
+                key, model, response.content, response.reasoning, (time.perf_counter() - started) * 1000
             )
-        return self._llm
+        return response
 
-    def llm_invoke(self, prompt: str, **kwargs) -> ReasoningResponse:
-        # Executa LLM e captura saída bruta
-        res = self.llm.invoke(prompt, **kwargs)
+    def _generate(
+        self, prompt: str, answer_format: Optional[AnswerFormat] = None, **kwargs
+    ) -> ReasoningResponse:
+        # Com answer_format, a geração é restrita ao formato e termina na resposta
+        if answer_format is not None:
+            kwargs = {**self.structured_kwargs(answer_format), **kwargs}
+        # Executa LLM e captura saída bruta (modelo em processo: uma chamada por vez; server/API: em paralelo)
+        with self.llm_handle.session() as llm:
+            res = llm.invoke(prompt, **kwargs)
+            prefix_cache = self.prefix_cache
+            call = prefix_cache.last_call if prefix_cache is not None else None
+        if call:
+            print(
+                f"⚡ KV prefix cache [{self.name}]: skipped {call['tokens_skipped']}/{call['prompt_tokens']} "
+                f"prompt tokens, evaluated {call['tokens_evaluated']} in {call['prefill_ms']:.0f} ms, "
+                f"~{call['ms_saved']:.0f} ms saved"
+            )
+        if answer_format is not None:
+            content, in_schema = self.parse_structured(res, answer_format)
+            valid = in_schema and is_valid_answer(answer_format, content)
+            return ReasoningResponse(content=content, reasoning="", valid=valid)
         content = ""
         reasoning = ""
         # 1) Tenta extrair diretamente do llm_output conforme OpenRouter JSON
@@ -83,7 +245,7 @@ class LLMBasedTool(BaseTool):
         messages: Union[str, List[Tuple[str, str]]]
     ) -> str:
         # Se LLM é via API, retorna texto puro
-        if isinstance(self._llm, ChatOpenAI) or isinstance(self.llm, ChatOpenAI):
+        if isinstance(self.llm, ChatOpenAI):
             if isinstance(messages, list):
                 return "".join(text for _, text in messages)
             return messages
@@ -107,7 +269,7 @@ class LLMBasedTool(BaseTool):
         return "".join(f"<|{role}|>{text}" for role, text in messages)
 
     def _run(self, prompt: str, **kwargs):
-        return self.llm.invoke(prompt, **kwargs)
+        return self.llm_handle.invoke(prompt, **kwargs)
 
     async def _arun(self, prompt: str, **kwargs):
         return self._run(prompt, **kwargs)
\ No newline at end of file
@@ -1,6 +1,7 @@
 from V3.tools.SpecificityCheckTool import LLMBasedTool
 from typing import ClassVar
 from V3.classes import GraphState, GraphStateManager
+from V3.answer_formats import ICD11_CODE_FORMAT
 
 
 class LLMCodeSelector(LLMBasedTool):
@@ -45,12 +46,12 @@ Assistant:"""
         messages = [("user", user_msg)]
         prompt = self.format_prompt(messages)
 
-        # Invoke the model to generate the code mapping
-        response = self.llm_invoke(prompt)
-        # Return the cleaned output
+        # Invoke the model to generate the code mapping, constrained to a code or code cluster
+        response = self.llm_invoke(prompt, answer_format=ICD11_CODE_FORMAT)
+        # Return the parsed answer
         return sm.update(
             {
-                "partial_output_code": response.content.strip(),
+                "partial_output_code": response.content,
                 "messages": self.convert_llm_response_to_langgraph_messages(
                     response, "LLM Stem Code Selection"
                 ),
@@ -1,8 +1,10 @@
-from typing import ClassVar
+import asyncio
+from typing import Any, ClassVar, Dict, List, Tuple
 from qdrant_client.http.models import Filter
-from V3.env import qdrant_client, collections
+from V3.env import qdrant_client, async_qdrant_client, catalog, retrieval_targets
 from V3.classes import GraphState, GraphStateManager
 from V3.tools.LLMBasedTool import LLMBasedTool
+from V3.answer_formats import SPECIFICITY_FORMAT, SPECIFICITY_LABELS
 import re
 
 # Stop words list to ignore during token comparison
@@ -17,39 +19,119 @@ class SpecificityCheckTool(LLMBasedTool):
     )
 
     def _run(self, state: GraphState) -> GraphState:
-        sm = GraphStateManager(state)
-
         if not state.partial_output_code:
-            return sm.update(
-                {
-                    "messages": [
-                        {
-                            "type": "ai",
-                            "content": "[Specificity Check]\nNo code found. Next step",
-                        }
-                    ],
-                }
-            )
+            return self._no_code(state)
+
+        codes = self._split_codes(state.partial_output_code)
+        fsn_by_code, missing_codes = self._catalog_fsns(codes)
+        if missing_codes:
+            results = qdrant_client.query_points(**self._fsn_request(missing_codes))
+            for result in results.points:
+                fsn_by_code[result.payload["code"]] = result.payload["concept_name"]
+        return self._check(state, codes, fsn_by_code)
+
+    async def _arun(self, state: GraphState) -> GraphState:
+        """
+        Async entry point (LangGraph server): the FSN lookup goes through
+        ``AsyncQdrantClient`` and the heuristic/LLM check runs in the default executor.
+        """
+        loop = asyncio.get_running_loop()
+        if async_qdrant_client is None:
+            return await loop.run_in_executor(None, self._run, state)
+        if not state.partial_output_code:
+            return self._no_code(state)
+
+        codes = self._split_codes(state.partial_output_code)
+        fsn_by_code, missing_codes = self._catalog_fsns(codes)
+        if missing_codes:
+            results = await async_qdrant_client.query_points(**self._fsn_request(missing_codes))
+            for result in results.points:
+                fsn_by_code[result.payload["code"]] = result.payload["concept_name"]
+        return await loop.run_in_executor(None, self._check, state, codes, fsn_by_code)
+
+    @staticmethod
+    def _no_code(state: GraphState) -> GraphState:
+        return GraphStateManager(state).update(
+            {
+                "messages": [
+                    {
+                        "type": "ai",
+                        "content": "[Specificity Check]\nNo code found. Next step",
+                    }
+                ],
+            }
+        )
 
-        # Captura o código parcial
-        code = state.partial_output_code
+    @staticmethod
+    def _split_codes(code: str) -> List[str]:
         # Separa o código pelos caracteres com regex: & ou /
-        codes = re.split(r"[&/]", code)
-        # captura os códigos na busca do banco vetorizado
-        results = qdrant_client.query_points(
-            collection_name=collections[0].name,
-            limit=len(codes),
-            with_payload=True,
-            query_filter=Filter(
+        return re.split(r"[&/]", code)
+
+    @staticmethod
+    def _catalog_fsns(codes: List[str]) -> Tuple[Dict[str, str], List[str]]:
+        # captura os FSNs no catálogo local e, na falta dele, no banco vetorizado
+        fsn_by_code = {}
+        if catalog is not None:
+            fsn_by_code = {c: catalog.fsn(c) for c in codes if catalog.fsn(c)}
+        return fsn_by_code, [c for c in codes if c not in fsn_by_code]
+
+    @staticmethod
+    def _fsn_request(codes: List[str]) -> Dict[str, Any]:
+        return {
+            "collection_name": retrieval_targets[0].name,
+            "limit": len(codes),
+            "with_payload": True,
+            "query_filter": Filter(
                 must=[
                     {"key": "code", "match": {"any": codes}},
                     {"key": "name_type", "match": {"value": "fsn"}},
                 ]
             ),
-        )
+        }
+
+    @staticmethod
+    def specificity_prompt(concept: str, fsn: str) -> str:
+        # Instruções e few-shot fixos primeiro e o par de conceitos no fim: o
+        # prefixo é igual em toda chamada e o llama.cpp reaproveita o KV dele
+        return f"""You are a medical coding assistant.
+
+Task:
+Given a clinical INPUT CONCEPT and a FINAL CONCEPT (which represents the ICD-11 code meaning), compare them and answer:
+
+Is the INPUT CONCEPT more specific, less specific, or equally specific when compared to the FINAL CONCEPT?
+
+Answer strictly with:
+- NARROWER-THAN → If the INPUT CONCEPT contains more detail than the FINAL CONCEPT (i.e., INPUT is more specific)
+- BROADER-THAN → If the FINAL CONCEPT contains more detail than the INPUT CONCEPT (i.e., FINAL is more specific)
+- SAME-AS → If both have the same level of specificity
+
+Few-shot examples:
+INPUT: "Acute appendicitis with perforation"
+FINAL: "Acute appendicitis"
+→ NARROWER-THAN
+
+INPUT: "Chronic liver disease"
+FINAL: "Nonalcoholic fatty liver disease with fibrosis"
+→ BROADER-THAN
+
+INPUT: "Type 2 diabetes mellitus"
+FINAL: "Type 2 diabetes mellitus"
+→ SAME-AS
+
+Do NOT explain. Output only the label.
+
+INPUT: "{concept}"
+FINAL: "{fsn}"
+
+Assistant:"""
+
+    def _check(self, state: GraphState, codes: List[str], fsn_by_code: Dict[str, str]) -> GraphState:
+        sm = GraphStateManager(state)
+        # Captura o código parcial
+        code = state.partial_output_code
 
         # Extrai os concept_name e une em uma única string
-        fsn = " ".join([result.payload["concept_name"] for result in results.points])
+        fsn = " ".join([fsn_by_code[c] for c in codes if c in fsn_by_code])
 
         # Step 1: Token-set heuristic
         def normalize(text: str) -> set[str]:
@@ -112,54 +194,31 @@ class SpecificityCheckTool(LLMBasedTool):
             )
 
         # Step 2: LLM judgment if heuristic was inconclusive
-        user_msg = f"""You are a medical coding assistant.
-
-Task:
-Given this clinical INPUT CONCEPT "{state.clinical_concept_input}" and this FINAL CONCEPT "{fsn}" (which represents the ICD-11 code meaning), compare them and answer:
-
-Is the INPUT CONCEPT more specific, less specific, or equally specific when compared to the FINAL CONCEPT?
-
-Answer strictly with:
-- NARROWER-THAN → If the INPUT CONCEPT contains more detail than the FINAL CONCEPT (i.e., INPUT is more specific)
-- BROADER-THAN → If the FINAL CONCEPT contains more detail than the INPUT CONCEPT (i.e., FINAL is more specific)
-- SAME-AS → If both have the same level of specificity
-
-Few-shot examples:
-INPUT: "Acute appendicitis with perforation"
-FINAL: "Acute appendicitis"
-→ NARROWER-THAN
-
-INPUT: "Chronic liver disease"
-FINAL: "Nonalcoholic fatty liver disease with fibrosis"
-→ BROADER-THAN
-
-INPUT: "Type 2 diabetes mellitus"
-FINAL: "Type 2 diabetes mellitus"
-→ SAME-AS
-
-Do NOT explain. Output only the label.
-
-Assistant:"""
-
+        user_msg = self.specificity_prompt(state.clinical_concept_input, fsn)
         messages = [("user", user_msg)]
         prompt = self.format_prompt(messages)
         print("📨 Prompt:", prompt)
 
-        response = self.llm_invoke(prompt)
+        # Tentativas anteriores inconclusivas para este código: a próxima amostra outra resposta
+        attempt = sum(m.name == "specificity_retry" and m.content == code for m in state.task_memory)
+
+        # Geração restrita a um dos três rótulos (GBNF local / JSON schema na API)
+        response = self.llm_invoke(prompt, answer_format=SPECIFICITY_FORMAT, attempt=attempt)
         # Caso a resposta seja NARROWER-THAN, BROADER-THAN ou SAME-AS, então retorna o code correspondente
-        if response.content.strip() in ["NARROWER-THAN", "BROADER-THAN", "SAME-AS"]:
+        if response.content in SPECIFICITY_LABELS:
             return sm.update(
                 {
                     "task_memory": task_memory,
                     "messages": self.convert_llm_response_to_langgraph_messages(
                         response, "Specificity Check"
                     ),
-                    "final_code": f"<map_type>{response.content.strip()}</map_type><code>{code}</code>",
+                    "final_code": f"<map_type>{response.content}</map_type><code>{code}</code>",
                 }
             )
         else:
             return sm.update(
                 {
+                    "task_memory": [{"name": "specificity_retry", "content": code}],
                     "messages": [
                         {
                             "type": "ai",
@@ -169,6 +228,3 @@ Assistant:"""
                     "final_code": "",
                 }
             )
-
-    def _arun(self, state: GraphState) -> GraphState:
-        return self._run(state)
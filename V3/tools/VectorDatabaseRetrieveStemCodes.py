@@ -1,8 +1,32 @@
 # Imports for type hints and Qdrant client models
-from typing import ClassVar, List, Set
-from qdrant_client.http.models import Filter
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, ClassVar, Dict, List, Optional, Set, Tuple, Union
+from pydantic import PrivateAttr
+from qdrant_client.http.models import Filter, Fusion, FusionQuery, Prefetch
 from langchain.tools import BaseTool
-from V3.env import qdrant_client, collections, TOP_K
+from V3.env import (
+    qdrant_client,
+    async_qdrant_client,
+    catalog,
+    retrieval_targets,
+    embedding_cache,
+    index_version,
+    Collection,
+    MultiVectorCollection,
+    TOP_K,
+    RETRIEVAL_OVERFETCH,
+    RETRIEVAL_CANDIDATE_POOL,
+    GROUPED_SEARCH,
+    SYNONYM_GROUP_SIZE,
+    CONCURRENT_RETRIEVAL,
+    FUSION_MODE,
+    FUSION_RRF_K,
+    FUSION_WEIGHTS,
+    SEARCH_PARAMS,
+)
+from V3.fusion import fuse_rankings
 from V3.classes import GraphState, GraphStateManager
 
 
@@ -18,8 +42,72 @@ class VectorDatabaseRetrieveStemCodes(BaseTool):
         "from Qdrant, formatted as a text block."
     )
 
+    # Tempos (ms) de embed/busca por encoder da última execução
+    _last_timings: Dict[str, Dict[str, float]] = PrivateAttr(default_factory=dict)
+
+    @property
+    def last_timings(self) -> Dict[str, Dict[str, float]]:
+        return self._last_timings
+
     def _run(self, state: GraphState) -> GraphState:
-        sm = GraphStateManager(state)
+        """
+        Synchronous execution entry point.
+        - Embeds the query text and searches each Qdrant collection for a pool of
+          stem leaf candidates, once per graph run (later looper passes reuse it).
+        - Fuses the per-encoder rankings into one globally ranked, deduplicated list.
+        - Reads the FSN denormalized in each payload.
+        - Formats and returns the results as a text block.
+        """
+        blacklist_codes = self._blacklist_codes(state)
+        text = state.clinical_concept_input
+        version = index_version.value()
+
+        candidate_pool, targets = self._pending_searches(state, blacklist_codes, version)
+        fresh = (
+            self._search_collections(targets, text, blacklist_codes, TOP_K * RETRIEVAL_CANDIDATE_POOL)
+            if targets
+            else None
+        )
+        candidate_pool, task_memory = self._merge_candidate_pool(text, version, candidate_pool, fresh)
+
+        stem_hits = self._fuse_stem_hits(candidate_pool, blacklist_codes)
+        missing_codes = self._fill_fsns_from_catalog(stem_hits)
+        if missing_codes:
+            self._apply_fsns(stem_hits, self._fetch_fsns(retrieval_targets[0].name, missing_codes))
+
+        return self._format_update(state, stem_hits, task_memory)
+
+    async def _arun(self, state: GraphState) -> GraphState:
+        """
+        Asynchronous entry point (LangGraph server): same flow as ``_run`` with the
+        Qdrant requests issued through ``AsyncQdrantClient`` and the encoders run
+        in the default executor. Backends without an async client run ``_run`` there.
+        """
+        loop = asyncio.get_running_loop()
+        if async_qdrant_client is None:
+            return await loop.run_in_executor(None, self._run, state)
+
+        blacklist_codes = self._blacklist_codes(state)
+        text = state.clinical_concept_input
+        version = await index_version.avalue()
+
+        candidate_pool, targets = self._pending_searches(state, blacklist_codes, version)
+        fresh = (
+            await self._asearch_collections(targets, text, blacklist_codes, TOP_K * RETRIEVAL_CANDIDATE_POOL)
+            if targets
+            else None
+        )
+        candidate_pool, task_memory = self._merge_candidate_pool(text, version, candidate_pool, fresh)
+
+        stem_hits = self._fuse_stem_hits(candidate_pool, blacklist_codes)
+        missing_codes = self._fill_fsns_from_catalog(stem_hits)
+        if missing_codes:
+            self._apply_fsns(stem_hits, await self._afetch_fsns(retrieval_targets[0].name, missing_codes))
+
+        return self._format_update(state, stem_hits, task_memory)
+
+    @staticmethod
+    def _blacklist_codes(state: GraphState) -> Set[str]:
         # Captura todos os códigos em state.task_memory cujo name é 'blacklist_code'
         blacklist_codes = set()
         print("********* ITEM *********")
@@ -27,84 +115,126 @@ class VectorDatabaseRetrieveStemCodes(BaseTool):
             print("item:", item)
             if item.name == "blacklist_code":
                 blacklist_codes.add(item.content)
-                    
-        
+
         print("++++++++++++++++++++")
         print("blacklist_codes:", blacklist_codes)
         print("++++++++++++++++++++")
+        return blacklist_codes
 
+    def _pending_searches(
+        self, state: GraphState, blacklist_codes: Set[str], version: str
+    ) -> Tuple[Optional[dict], List[Union[Collection, MultiVectorCollection]]]:
         """
-        Synchronous execution entry point.
-        - Embeds the query text.
-        - Searches each Qdrant collection for matching stem leaf codes.
-        - Deduplicates results and fetches FSN for each code.
-        - Formats and returns the results as a text block.
+        Returns the candidate pool already computed in this graph run (if any) and
+        the targets that still need a Qdrant search.
         """
-        # Track seen codes to avoid duplicates
-        seen_codes: Set[str] = set()
-        # Store formatted results
-        results: List[str] = []
-        # Store last-stem hits in memory
-        stem_hits: List[dict] = []
+        # Pool de candidatos (com over-fetch) já calculado nesta execução do grafo,
+        # contra a mesma versão do índice (um pool de antes de um switch é refeito)
+        candidate_pool = self._find_candidate_pool(state, version)
+        if candidate_pool is None:
+            return None, list(retrieval_targets)
 
-        # Iterate through each vector collection
-        for collection in collections:
-            # Embed the query text into a vector
-            q_vector = collection.embed(state.clinical_concept_input)
+        # Só volta ao Qdrant para coleções cujo pool esgotou antes do fim real
+        starved = [
+            c
+            for c in retrieval_targets
+            if not candidate_pool["collections"][c.name]["exhausted"]
+            and len(self._available(candidate_pool["collections"][c.name]["hits"], blacklist_codes)) < TOP_K
+        ]
+        print(f"♻️ Reusing stem candidate pool (refreshing: {[c.name for c in starved]})")
+        return candidate_pool, starved
 
-            # Query Qdrant for stem leaf codes using a filter
-            hits = qdrant_client.query_points(
-                collection_name=collection.name,
-                query=q_vector,
-                with_payload=True,
-                limit=TOP_K,
-                query_filter=Filter(
-                    must=[
-                        {"key": "code_type", "match": {"value": "stem"}},
-                        {"key": "is_leaf", "match": {"value": True}},
-                    ]
-                ),
-            )
+    def _merge_candidate_pool(
+        self, text: str, version: str, candidate_pool: Optional[dict], fresh: Optional[Dict[str, dict]]
+    ) -> Tuple[dict, List[dict]]:
+        """Merges fresh searches into the pool and returns it with the memory entries to append."""
+        if fresh is None:
+            return candidate_pool, []
+        candidate_pool = {
+            "query": text,
+            "index_version": version,
+            "collections": {**(candidate_pool or {}).get("collections", {}), **fresh},
+        }
+        return candidate_pool, [
+            {"name": "stem_candidates", "content": candidate_pool},
+            {"name": "retrieval_timings", "content": self._last_timings},
+        ]
 
-            # Subtrai os valores que os códigos estão em blacklist
-            hits.points = [
-                point
-                for point in hits.points
-                if point.payload["code"] not in blacklist_codes
-            ]
-
-            print(">>>>>>>>>>>")
-            print("hits.points", [f"{p.payload['code']} - {p.payload['concept_name']}" for p in hits.points])
-            print(">>>>>>>>>>>")
+    def _fuse_stem_hits(self, candidate_pool: dict, blacklist_codes: Set[str]) -> List[dict]:
+        # Top-K de cada coleção após remover a blacklist
+        searches = [
+            self._available(candidate_pool["collections"][c.name]["hits"], blacklist_codes)[:TOP_K]
+            for c in retrieval_targets
+        ]
 
-            # Process each returned point
-            for point in hits.points:
-                payload = point.payload or {}
+        # Fusão dos rankings de cada encoder em uma lista global ranqueada
+        rankings: Dict[str, List[Tuple[str, float]]] = {}
+        payload_by_code: Dict[str, dict] = {}
+        synonym_matches: Dict[str, Dict[str, int]] = {}
+        for collection, hits in zip(retrieval_targets, searches):
+            rankings[collection.name] = []
+            for hit in hits:
+                payload = hit["payload"]
                 code = payload.get("code", "").strip()
-                label = payload.get("concept_name", "").strip()
-                # Skip duplicate or empty codes
-                if not code or code in seen_codes:
-                    continue
+                rankings[collection.name].append((code, hit["score"]))
+                synonym_matches.setdefault(code, {})[collection.name] = hit.get("synonym_matches", 1)
+                # Mantém o payload da primeira coleção em que o código aparece
+                payload_by_code.setdefault(code, payload)
+
+        # Store last-stem hits in memory, with per-encoder scores and ranks
+        stem_hits: List[dict] = []
+        for rank, fused in enumerate(
+            fuse_rankings(rankings, mode=FUSION_MODE, rrf_k=FUSION_RRF_K, weights=FUSION_WEIGHTS),
+            start=1,
+        ):
+            payload = payload_by_code[fused["code"]]
+            # Store the code, label, and FSN (denormalized at index time) in memory
+            stem_hits.append(
+                {
+                    **payload,
+                    **fused,
+                    "rank": rank,
+                    "synonym_matches": synonym_matches[fused["code"]],
+                    "fsn": payload.get("fsn"),
+                    "label": payload.get("concept_name", "").strip(),
+                }
+            )
+        return stem_hits
 
-                # Mark code as seen
-                seen_codes.add(code)
-                # Fetch the fully specified name (FSN) for this code
-                fsn = self._fetch_fsn(collection.name, code)
+    @staticmethod
+    def _fill_fsns_from_catalog(stem_hits: List[dict]) -> List[str]:
+        """Fills missing FSNs from the local catalog; returns the codes still missing."""
+        # Coleções antigas não têm o FSN no payload: usa o catálogo local
+        if catalog is not None:
+            for hit in stem_hits:
+                if hit["fsn"] is None:
+                    hit["fsn"] = catalog.fsn(hit["code"]) or None
+        # e, sem catálogo, busca todos os faltantes de uma vez no Qdrant
+        return [hit["code"] for hit in stem_hits if hit["fsn"] is None]
 
-                # Store the code, label, and FSN in memory
-                stem_hits.append({**payload, "fsn": fsn, "label": label})
+    @staticmethod
+    def _apply_fsns(stem_hits: List[dict], fsn_by_code: Dict[str, str]) -> None:
+        for hit in stem_hits:
+            if hit["fsn"] is None:
+                hit["fsn"] = fsn_by_code.get(hit["code"], "")
 
-                # Format result: include synonym if FSN differs from label
-                if fsn == label:
-                    results.append(f"- {code} ({fsn})")
-                else:
-                    results.append(f"- {code} ({fsn} – synonym: {label})")
+    @staticmethod
+    def _format_update(state: GraphState, stem_hits: List[dict], task_memory: List[dict]) -> GraphState:
+        sm = GraphStateManager(state)
+        # Store formatted results
+        results: List[str] = []
+        for hit in stem_hits:
+            code, fsn, label = hit["code"], hit["fsn"].strip(), hit["label"]
+            # Format result: include synonym if FSN differs from label
+            if fsn == label:
+                results.append(f"- {code} ({fsn})")
+            else:
+                results.append(f"- {code} ({fsn} – synonym: {label})")
 
         # Prepare and return the output block
         if results:
             header = "Relevant matched stem codes found:"
             # Só adiciona stem_hits a task_memory se ainda não existe
-            task_memory: List[dict] = []
             if len([h for h in state.task_memory if h.name == "stem_hits"]) == 0:
                 task_memory.append({"name": "stem_hits", "content": stem_hits})
             return sm.update(
@@ -126,32 +256,392 @@ class VectorDatabaseRetrieveStemCodes(BaseTool):
             )
         # Return fallback message if no matches
         return sm.update(
-            {"messages": [{"type": "ai", "content": "No relevant stem codes found."}]}
+            {
+                "task_memory": task_memory,
+                "messages": [{"type": "ai", "content": "No relevant stem codes found."}],
+            }
         )
 
-    def _arun(self, state: GraphState) -> str:
+    @staticmethod
+    def _find_candidate_pool(state: GraphState, version: str) -> Optional[dict]:
+        """Returns the latest candidate pool computed in this run for the same input and index version."""
+        for item in reversed(state.task_memory):
+            if (
+                item.name == "stem_candidates"
+                and item.content.get("query") == state.clinical_concept_input
+                and item.content.get("index_version") == version
+            ):
+                return item.content
+        return None
+
+    @staticmethod
+    def _available(hits: List[dict], blacklist_codes: Set[str]) -> List[dict]:
+        return [hit for hit in hits if hit["payload"].get("code", "").strip() not in blacklist_codes]
+
+    def _search_collections(
+        self,
+        targets: List[Union[Collection, MultiVectorCollection]],
+        text: str,
+        blacklist_codes: Set[str],
+        k: int,
+    ) -> Dict[str, dict]:
         """
-        Asynchronous entry point mapping to the synchronous implementation.
+        Runs embed + search for each target collection (concurrently when enabled)
+        and returns ``{name: {"hits": [...], "exhausted": bool}}``.
         """
-        return self._run(state)
+        started = time.perf_counter()
+        if CONCURRENT_RETRIEVAL:
+            # Cada coleção (embed + busca) roda em sua própria thread
+            with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+                searches = list(
+                    pool.map(
+                        lambda c: self._search_collection(c, text, blacklist_codes, k),
+                        targets,
+                    )
+                )
+        else:
+            searches = [
+                self._search_collection(c, text, blacklist_codes, k) for c in targets
+            ]
+        return self._collect_searches(targets, searches, started)
+
+    async def _asearch_collections(
+        self,
+        targets: List[Union[Collection, MultiVectorCollection]],
+        text: str,
+        blacklist_codes: Set[str],
+        k: int,
+    ) -> Dict[str, dict]:
+        """Async ``_search_collections``: the searches always overlap on the event loop."""
+        started = time.perf_counter()
+        searches = await asyncio.gather(
+            *(self._asearch_collection(c, text, blacklist_codes, k) for c in targets)
+        )
+        return self._collect_searches(targets, searches, started)
+
+    def _collect_searches(
+        self,
+        targets: List[Union[Collection, MultiVectorCollection]],
+        searches: List[Tuple[List[dict], bool, Dict[str, float]]],
+        started: float,
+    ) -> Dict[str, dict]:
+        wall_ms = (time.perf_counter() - started) * 1000
 
-    def _fetch_fsn(self, collection_name: str, code: str) -> str:
+        self._last_timings = {
+            collection.name: timings
+            for collection, (_, _, timings) in zip(targets, searches)
+        }
+        serial_ms = sum(t["embed_ms"] + t["search_ms"] for t in self._last_timings.values())
+        self._last_timings["total"] = {"wall_ms": wall_ms, "serial_ms": serial_ms}
+        print(f"⏱️ Retrieval timings (concurrent={CONCURRENT_RETRIEVAL}): {self._last_timings}")
+        print(f"🗃️ Embedding cache: {embedding_cache.stats()}")
+
+        return {
+            collection.name: {"hits": hits, "exhausted": exhausted}
+            for collection, (hits, exhausted, _) in zip(targets, searches)
+        }
+
+    def _search_collection(
+        self,
+        collection: Union[Collection, MultiVectorCollection],
+        text: str,
+        blacklist_codes: Set[str],
+        k: int = TOP_K,
+    ) -> Tuple[List[dict], bool, Dict[str, float]]:
+        """
+        Embeds the text with the collection encoder and queries its stem leaf codes.
+        Returns the best hit (payload, score, synonym_matches) of up to ``k`` distinct
+        non-blacklisted codes, whether the filtered collection ran out, and the
+        embed/search timings in ms.
+        """
+        started = time.perf_counter()
+        # Embed the query text into a vector (one per named vector in multi-vector mode)
+        q_vector = collection.embed(text)
+        embedded = time.perf_counter()
+
+        query, query_filter = self._search_request(q_vector, blacklist_codes, k)
+        if GROUPED_SEARCH and hasattr(qdrant_client, "query_points_groups"):
+            hits, exhausted, pages = self._grouped_search(collection, query, query_filter, k)
+        else:
+            hits, exhausted, pages = self._paged_search(collection, query, query_filter, k)
+        searched = time.perf_counter()
+
+        return self._search_result(collection, hits, exhausted, pages, started, embedded, searched)
+
+    async def _asearch_collection(
+        self,
+        collection: Union[Collection, MultiVectorCollection],
+        text: str,
+        blacklist_codes: Set[str],
+        k: int = TOP_K,
+    ) -> Tuple[List[dict], bool, Dict[str, float]]:
+        """Async ``_search_collection``; the encoder runs in the default executor."""
+        started = time.perf_counter()
+        q_vector = await asyncio.get_running_loop().run_in_executor(None, collection.embed, text)
+        embedded = time.perf_counter()
+
+        query, query_filter = self._search_request(q_vector, blacklist_codes, k)
+        if GROUPED_SEARCH:
+            hits, exhausted, pages = await self._agrouped_search(collection, query, query_filter, k)
+        else:
+            hits, exhausted, pages = await self._apaged_search(collection, query, query_filter, k)
+        searched = time.perf_counter()
+
+        return self._search_result(collection, hits, exhausted, pages, started, embedded, searched)
+
+    @staticmethod
+    def _search_result(
+        collection: Any,
+        hits: List[dict],
+        exhausted: bool,
+        pages: int,
+        started: float,
+        embedded: float,
+        searched: float,
+    ) -> Tuple[List[dict], bool, Dict[str, float]]:
+        print(">>>>>>>>>>>")
+        print(f"hits.points [{collection.name}]", [f"{h['payload']['code']} - {h['payload']['concept_name']}" for h in hits])
+        print(">>>>>>>>>>>")
+
+        return hits, exhausted, {
+            "embed_ms": (embedded - started) * 1000,
+            "search_ms": (searched - embedded) * 1000,
+            "pages": pages,
+        }
+
+    @classmethod
+    def _search_request(
+        cls, q_vector: Union[List[float], Dict[str, List[float]]], blacklist_codes: Set[str], k: int
+    ) -> Tuple[Dict[str, Any], Filter]:
+        # Blacklist vai no próprio filtro (must_not)
+        query_filter = Filter(
+            must=[
+                {"key": "code_type", "match": {"value": "stem"}},
+                {"key": "is_leaf", "match": {"value": True}},
+            ],
+            must_not=(
+                [{"key": "code", "match": {"any": sorted(blacklist_codes)}}]
+                if blacklist_codes
+                else None
+            ),
+        )
+        return cls._query_kwargs(q_vector, query_filter, k), query_filter
+
+    @staticmethod
+    def _query_kwargs(
+        q_vector: Union[List[float], Dict[str, List[float]]], query_filter: Filter, k: int
+    ) -> Dict[str, Any]:
+        """
+        Plain vector query, or, for a multi-vector collection, one prefetch per
+        named vector fused server-side with RRF. Both carry the quantization
+        search params (oversampling + rescore) of QDRANT_STORAGE.
+        """
+        if not isinstance(q_vector, dict):
+            return {"query": q_vector, "search_params": SEARCH_PARAMS}
+        return {
+            "prefetch": [
+                Prefetch(
+                    query=vector,
+                    using=vector_name,
+                    filter=query_filter,
+                    limit=k * SYNONYM_GROUP_SIZE * RETRIEVAL_OVERFETCH,
+                    params=SEARCH_PARAMS,
+                )
+                for vector_name, vector in q_vector.items()
+            ],
+            "query": FusionQuery(fusion=Fusion.RRF),
+        }
+
+    @staticmethod
+    def _grouped_request(collection: Any, query: Dict[str, Any], query_filter: Filter, k: int) -> Dict[str, Any]:
+        return {
+            "collection_name": collection.name,
+            **query,
+            "group_by": "code",
+            "limit": k,
+            "group_size": SYNONYM_GROUP_SIZE,
+            "with_payload": True,
+            "query_filter": query_filter,
+        }
+
+    @staticmethod
+    def _grouped_hits(response: Any, k: int) -> Tuple[List[dict], bool]:
+        hits = [
+            {
+                "payload": group.hits[0].payload or {},
+                "score": group.hits[0].score,
+                "synonym_matches": len(group.hits),
+            }
+            for group in response.groups
+            if group.hits
+        ]
+        return hits, len(response.groups) < k
+
+    @staticmethod
+    def _widened_prefetch(query: Dict[str, Any], filtered_points: int) -> Optional[Dict[str, Any]]:
+        """
+        With a multi-vector prefetch, the server fuses and groups only the
+        prefetched candidates, so fewer than ``k`` groups only means the
+        collection is exhausted when the prefetch already covered every
+        filtered point. Otherwise returns the query with the prefetch limit doubled.
+        """
+        limit = query["prefetch"][0].limit
+        if filtered_points <= limit:
+            return None
+        return {
+            **query,
+            "prefetch": [
+                prefetch.model_copy(update={"limit": min(limit * 2, filtered_points)})
+                for prefetch in query["prefetch"]
+            ],
+        }
+
+    def _grouped_search(
+        self, collection: Any, query: Dict[str, Any], query_filter: Filter, k: int
+    ) -> Tuple[List[dict], bool, int]:
         """
-        Helper to fetch the FSN for a given code from Qdrant.
-        - Applies a filter to retrieve only FSN entries.
+        One group-by-``code`` request: ``k`` distinct codes, each with its
+        best-scoring synonym and how many of its synonyms matched.
         """
-        # Query Qdrant for the FSN name_type payload
-        response = qdrant_client.query_points(
-            collection_name=collection_name,
-            with_payload=True,
-            limit=1,
-            query_filter=Filter(
+        pages = 0
+        filtered_points = None
+        while True:
+            response = qdrant_client.query_points_groups(
+                **self._grouped_request(collection, query, query_filter, k)
+            )
+            pages += 1
+            hits, short = self._grouped_hits(response, k)
+            if not short or "prefetch" not in query:
+                return hits, short, pages
+            if filtered_points is None:
+                filtered_points = qdrant_client.count(
+                    collection_name=collection.name, count_filter=query_filter, exact=True
+                ).count
+            query = self._widened_prefetch(query, filtered_points)
+            if query is None:
+                return hits, True, pages
+
+    async def _agrouped_search(
+        self, collection: Any, query: Dict[str, Any], query_filter: Filter, k: int
+    ) -> Tuple[List[dict], bool, int]:
+        pages = 0
+        filtered_points = None
+        while True:
+            response = await async_qdrant_client.query_points_groups(
+                **self._grouped_request(collection, query, query_filter, k)
+            )
+            pages += 1
+            hits, short = self._grouped_hits(response, k)
+            if not short or "prefetch" not in query:
+                return hits, short, pages
+            if filtered_points is None:
+                filtered_points = (
+                    await async_qdrant_client.count(
+                        collection_name=collection.name, count_filter=query_filter, exact=True
+                    )
+                ).count
+            query = self._widened_prefetch(query, filtered_points)
+            if query is None:
+                return hits, True, pages
+
+    @staticmethod
+    def _add_page(
+        hits: List[dict], index_by_code: Dict[str, int], points: List[Any], k: int
+    ) -> None:
+        """Adds a page of points to ``hits``, counting repeated codes as synonym matches."""
+        for point in points:
+            code = (point.payload or {}).get("code", "").strip()
+            if not code:
+                continue
+            if code in index_by_code:
+                hits[index_by_code[code]]["synonym_matches"] += 1
+            elif len(index_by_code) < k:
+                index_by_code[code] = len(hits)
+                hits.append({"payload": point.payload or {}, "score": point.score, "synonym_matches": 1})
+
+    def _paged_search(
+        self, collection: Any, query: Dict[str, Any], query_filter: Filter, k: int
+    ) -> Tuple[List[dict], bool, int]:
+        """
+        Fallback for backends without group-by: pages with over-fetch until
+        ``k`` distinct codes are found (synonyms repeat codes).
+        """
+        page_size = k * RETRIEVAL_OVERFETCH
+        hits: List[dict] = []
+        index_by_code: Dict[str, int] = {}
+        pages = 0
+        exhausted = False
+        while len(index_by_code) < k:
+            response = qdrant_client.query_points(
+                collection_name=collection.name,
+                **query,
+                with_payload=True,
+                limit=page_size,
+                offset=pages * page_size,
+                query_filter=query_filter,
+            )
+            pages += 1
+            self._add_page(hits, index_by_code, response.points, k)
+            # Coleção esgotada para esse filtro
+            if len(response.points) < page_size:
+                exhausted = True
+                break
+        return hits, exhausted, pages
+
+    async def _apaged_search(
+        self, collection: Any, query: Dict[str, Any], query_filter: Filter, k: int
+    ) -> Tuple[List[dict], bool, int]:
+        page_size = k * RETRIEVAL_OVERFETCH
+        hits: List[dict] = []
+        index_by_code: Dict[str, int] = {}
+        pages = 0
+        exhausted = False
+        while len(index_by_code) < k:
+            response = await async_qdrant_client.query_points(
+                collection_name=collection.name,
+                **query,
+                with_payload=True,
+                limit=page_size,
+                offset=pages * page_size,
+                query_filter=query_filter,
+            )
+            pages += 1
+            self._add_page(hits, index_by_code, response.points, k)
+            if len(response.points) < page_size:
+                exhausted = True
+                break
+        return hits, exhausted, pages
+
+    @staticmethod
+    def _fsn_request(collection_name: str, codes: List[str]) -> Dict[str, Any]:
+        # Query Qdrant for the FSN name_type payload of all codes at once
+        return {
+            "collection_name": collection_name,
+            "with_payload": ["code", "concept_name"],
+            "limit": len(codes),
+            "query_filter": Filter(
                 must=[
-                    {"key": "code", "match": {"value": code}},
+                    {"key": "code", "match": {"any": codes}},
                     {"key": "name_type", "match": {"value": "fsn"}},
                 ]
             ),
-        )
-        fsn_payload = response.points[0].payload or {}
-        # Extract and return the FSN concept name
-        return fsn_payload.get("concept_name", "").strip()
+        }
+
+    @staticmethod
+    def _fsns_by_code(response: Any) -> Dict[str, str]:
+        # Extract and return the FSN concept name per code
+        return {
+            (point.payload or {}).get("code", ""): (point.payload or {}).get("concept_name", "").strip()
+            for point in response.points
+        }
+
+    def _fetch_fsns(self, collection_name: str, codes: List[str]) -> Dict[str, str]:
+        """
+        Fallback for collections indexed without the denormalized FSN payload.
+        Fetches the FSN of every given code in a single ``match: any`` request.
+        """
+        return self._fsns_by_code(qdrant_client.query_points(**self._fsn_request(collection_name, codes)))
+
+    async def _afetch_fsns(self, collection_name: str, codes: List[str]) -> Dict[str, str]:
+        response = await async_qdrant_client.query_points(**self._fsn_request(collection_name, codes))
+        return self._fsns_by_code(response)
@@ -0,0 +1,87 @@
+"""
+Throughput de checagens de especificidade concorrentes (a chamada ao LLM do
+SpecificityCheckTool, com o mesmo prompt e a mesma gramática) por backend:
+``llama-cpp`` (GGUF em processo, uma chamada por vez) vs ``llama-server``
+(llama.cpp server com slots paralelos e batching contínuo).
+
+Mede, para cada backend, com N chamadas em voo (threads, como o executor do
+LangGraph): chamadas/s, latência mean/p50/p95 e, entre backends, a
+concordância dos rótulos para os mesmos pares.
+
+Importa o V3 (carrega os encoders e o cliente do Qdrant do env.py).
+
+Uso:
+    python helpers/llama_server.py --slots 4 &
+    LLAMA_SERVER_URL=http://localhost:8080/v1 LLAMA_SERVER_SLOTS=4 python helpers/benchmark_llm_backends.py
+    python helpers/benchmark_llm_backends.py --backends llama-server --calls 64 --concurrency 8
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Mede geração: sem o cache de respostas, os prompts repetidos seriam acertos
+os.environ["LLM_CACHE_PATH"] = ""
+from helpers.benchmark_qdrant_transport import summary
+from helpers.llm_registry import llm_registry
+from V3.answer_formats import SPECIFICITY_FORMAT
+from V3.tools.SpecificityCheckTool import SpecificityCheckTool
+
+# (conceito de entrada, FSN do código) com os três rótulos possíveis
+PAIRS = [
+    ("Acute appendicitis with generalised peritonitis", "Acute appendicitis"),
+    ("Pneumonia", "Bacterial pneumonia"),
+    ("Essential hypertension", "Essential hypertension"),
+    ("Fracture of neck of femur, left side", "Fracture of femur"),
+    ("Diabetes mellitus", "Type 2 diabetes mellitus with nephropathy"),
+    ("Migraine without aura", "Migraine without aura"),
+    ("Chronic kidney disease stage 4", "Chronic kidney disease"),
+    ("Infection of skin", "Cellulitis of lower limb"),
+]
+
+
+def timed_call(tool, prompt):
+    start = time.perf_counter()
+    response = tool.llm_invoke(prompt, answer_format=SPECIFICITY_FORMAT)
+    return response.content, (time.perf_counter() - start) * 1000
+
+
+def run_backend(backend, calls, concurrency):
+    tool = SpecificityCheckTool()
+    tool.use_backend(backend)
+    prompts = [tool.format_prompt([("user", tool.specificity_prompt(c, f))]) for c, f in PAIRS]
+    jobs = [prompts[i % len(prompts)] for i in range(calls)]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Aquecimento: carga do modelo / conexões do pool e prefixo em cache
+        list(pool.map(lambda p: timed_call(tool, p), prompts[:concurrency]))
+        start = time.perf_counter()
+        results = list(pool.map(lambda p: timed_call(tool, p), jobs))
+        elapsed = time.perf_counter() - start
+
+    labels = [label for label, _ in results[: len(PAIRS)]]
+    latencies = [ms for _, ms in results]
+    print(f"📈 [{backend}] {calls / elapsed:.2f} calls/s with {concurrency} in flight | {summary(latencies)}")
+    return labels
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="llama-cpp,llama-server", type=lambda v: v.split(","))
+    parser.add_argument("--calls", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("LLAMA_SERVER_SLOTS", "4")))
+    args = parser.parse_args()
+    if args.calls < len(PAIRS):
+        parser.error(f"--calls must be at least {len(PAIRS)}")
+
+    labels_by_backend = {backend: run_backend(backend, args.calls, args.concurrency) for backend in args.backends}
+
+    if len(labels_by_backend) > 1:
+        reference, *others = args.backends
+        for backend in others:
+            same = sum(a == b for a, b in zip(labels_by_backend[reference], labels_by_backend[backend]))
+            print(f"🔎 Label agreement {reference} vs {backend}: {same}/{len(PAIRS)}")
+    print(f"🧠 Models: {llm_registry.stats()}")
@@ -0,0 +1,111 @@
+"""
+Microbenchmark HTTP vs gRPC contra um Qdrant local (docker/container na
+porta 6333/6334), com os clientes criados pela mesma fábrica usada pelos tools.
+
+Mede, para cada transporte:
+- latência por requisição (mean/p50/p95) com o cliente síncrono, sequencial
+- throughput (req/s) com o cliente assíncrono e N requisições em voo
+
+As queries são vetores já gravados na coleção (sem carregar o encoder), com o
+mesmo filtro stem/leaf e group-by ``code`` do retrieval do V3.
+
+Uso:
+    QDRANT_HOST=localhost QDRANT_PORT=6333 python helpers/benchmark_qdrant_transport.py
+    python helpers/benchmark_qdrant_transport.py --collection icd11_concepts_sapbert --concurrency 32
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+from qdrant_client.http.models import Filter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from helpers.model_loader import load_async_qdrant_client, load_qdrant_client
+
+STEM_FILTER = Filter(
+    must=[
+        {"key": "code_type", "match": {"value": "stem"}},
+        {"key": "is_leaf", "match": {"value": True}},
+    ]
+)
+
+
+def summary(latencies):
+    ordered = sorted(latencies)
+    return (
+        f"mean={statistics.mean(ordered):.2f}ms "
+        f"p50={ordered[len(ordered) // 2]:.2f}ms "
+        f"p95={ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]:.2f}ms"
+    )
+
+
+def request(collection_name, vector, limit):
+    return {
+        "collection_name": collection_name,
+        "query": vector,
+        "group_by": "code",
+        "limit": limit,
+        "group_size": 5,
+        "with_payload": True,
+        "query_filter": STEM_FILTER,
+    }
+
+
+def sync_latencies(client, collection_name, vectors, limit):
+    latencies = []
+    for vector in vectors:
+        start = time.perf_counter()
+        client.query_points_groups(**request(collection_name, vector, limit))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def async_throughput(client, collection_name, vectors, limit, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(vector):
+        async with semaphore:
+            await client.query_points_groups(**request(collection_name, vector, limit))
+
+    # Aquecimento (conexões / canal) no mesmo event loop da medição
+    await asyncio.gather(*(one(v) for v in vectors[:concurrency]))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(v) for v in vectors))
+    return len(vectors) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", default="icd11_concepts_mpnet")
+    parser.add_argument("--queries", type=int, default=200, help="Stored vectors used as queries")
+    parser.add_argument("--limit", type=int, default=9)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    if os.getenv("QDRANT_BACKEND", "http") != "http":
+        parser.error("the transport benchmark needs QDRANT_BACKEND=http")
+
+    records, _ = load_qdrant_client(prefer_grpc=False).scroll(
+        collection_name=args.collection,
+        scroll_filter=STEM_FILTER,
+        limit=args.queries,
+        with_vectors=True,
+    )
+    vectors = [r.vector for r in records]
+    print(f"📊 {len(vectors)} queries on {args.collection} (limit={args.limit}, concurrency={args.concurrency})")
+
+    for label, prefer_grpc in (("HTTP", False), ("gRPC", True)):
+        client = load_qdrant_client(prefer_grpc=prefer_grpc)
+        async_client = load_async_qdrant_client(prefer_grpc=prefer_grpc)
+        # Aquecimento (conexões / canal) fora da medição
+        sync_latencies(client, args.collection, vectors[:5], args.limit)
+
+        latencies = sync_latencies(client, args.collection, vectors, args.limit)
+        throughput = asyncio.run(
+            async_throughput(async_client, args.collection, vectors, args.limit, args.concurrency)
+        )
+        print(f"🔌 {label:<4}: {summary(latencies)} | async {throughput:.1f} req/s")
@@ -0,0 +1,114 @@
+"""
+Compara latência e concordância top-K entre o Qdrant remoto (HTTP) e um
+backend local (índice NumPy ou Qdrant em modo path) no mesmo conjunto de queries.
+
+Uso:
+    python helpers/benchmark_retrieval.py --local-index ./local_index
+    python helpers/benchmark_retrieval.py --qdrant-path ./qdrant_local --queries queries.txt
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Filter
+from sentence_transformers import SentenceTransformer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from helpers.local_index import LocalVectorIndex
+
+DEFAULT_QUERIES = [
+    "Cholera",
+    "Acute appendicitis with perforation",
+    "Type 2 diabetes mellitus",
+    "Carcinoma in situ of skin of perineum",
+    "Diverticulitis of cecum",
+    "Chronic liver disease",
+    "Fracture of left femur",
+    "Essential hypertension",
+    "Bacterial pneumonia",
+    "Migraine without aura",
+]
+
+STEM_FILTER = Filter(
+    must=[
+        {"key": "code_type", "match": {"value": "stem"}},
+        {"key": "is_leaf", "match": {"value": True}},
+    ]
+)
+
+
+def timed_queries(client, collection_name, vectors, limit, repeats):
+    latencies, results = [], []
+    for vector in vectors:
+        for r in range(repeats):
+            start = time.perf_counter()
+            response = client.query_points(
+                collection_name=collection_name,
+                query=vector,
+                with_payload=True,
+                limit=limit,
+                query_filter=STEM_FILTER,
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+        results.append([p.payload["code"] for p in response.points])
+    return latencies, results
+
+
+def summary(latencies):
+    ordered = sorted(latencies)
+    return (
+        f"mean={statistics.mean(ordered):.2f}ms "
+        f"p50={ordered[len(ordered) // 2]:.2f}ms "
+        f"p95={ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]:.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--collection", default="icd11_concepts_mpnet")
+    parser.add_argument("--model", default="sentence-transformers/all-mpnet-base-v2")
+    parser.add_argument("--local-index", help="NumPy local index directory")
+    parser.add_argument("--qdrant-path", help="Embedded Qdrant directory")
+    parser.add_argument("--queries", help="Text file with one query per line")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    model = SentenceTransformer(args.model, device="cpu")
+    vectors = model.encode(queries, convert_to_numpy=True, normalize_embeddings=True).tolist()
+
+    remote = QdrantClient(
+        host=os.getenv("QDRANT_HOST", "qdrant.filipelopes.me"),
+        port=int(os.getenv("QDRANT_PORT", "80")),
+        prefer_grpc=False,
+    )
+    if args.local_index:
+        local = LocalVectorIndex(args.local_index)
+    elif args.qdrant_path:
+        local = QdrantClient(path=args.qdrant_path)
+    else:
+        parser.error("pass --local-index or --qdrant-path")
+
+    # Aquecimento (carrega shards / conexões) fora da medição
+    for client in (remote, local):
+        client.query_points(collection_name=args.collection, query=vectors[0], limit=1)
+
+    remote_lat, remote_codes = timed_queries(remote, args.collection, vectors, args.limit, args.repeats)
+    local_lat, local_codes = timed_queries(local, args.collection, vectors, args.limit, args.repeats)
+
+    overlap = statistics.mean(
+        len(set(r) & set(l)) / max(len(r), 1) for r, l in zip(remote_codes, local_codes)
+    )
+    print(f"📊 {len(queries)} queries x {args.repeats} repeats on {args.collection} (top-{args.limit})")
+    print(f"🌐 HTTP : {summary(remote_lat)}")
+    print(f"💾 Local: {summary(local_lat)}")
+    print(f"🎯 Top-{args.limit} code overlap: {overlap:.1%}")
@@ -0,0 +1,100 @@
+"""
+Checa o trade-off latência/recall de um backend de encoder (onnx, onnx-int8,
+fastembed) contra os embeddings fp32 já gravados no Qdrant.
+
+Para uma amostra de FSNs de uma coleção, re-encoda o texto com o backend
+candidato e compara:
+- cosseno entre o vetor novo e o vetor fp32 armazenado
+- overlap dos top-K vizinhos (códigos) buscados com cada um dos vetores
+- latência de encode do backend candidato vs PyTorch fp32
+
+Uso:
+    python helpers/check_encoder_backend.py --collection icd11_concepts_sapbert \\
+        --uri cambridgeltl/SapBERT-from-PubMedBERT-fulltext --backend onnx-int8
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import numpy as np
+from qdrant_client.http.models import Filter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from helpers.encoders import ENCODER_BACKENDS, load_encoder
+from helpers.model_loader import load_qdrant_client
+
+STEM_FILTER = Filter(
+    must=[
+        {"key": "code_type", "match": {"value": "stem"}},
+        {"key": "is_leaf", "match": {"value": True}},
+    ]
+)
+
+
+def neighbor_codes(client, collection_name, vector, k):
+    response = client.query_points(
+        collection_name=collection_name,
+        query=vector,
+        with_payload=["code"],
+        limit=k,
+        query_filter=STEM_FILTER,
+    )
+    return {p.payload["code"] for p in response.points}
+
+
+def timed_encode(model, texts):
+    start = time.perf_counter()
+    vectors = model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    return np.asarray(vectors, dtype=np.float32), (time.perf_counter() - start) * 1000 / len(texts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", default="icd11_concepts_mpnet")
+    parser.add_argument("--uri", default="sentence-transformers/all-mpnet-base-v2")
+    parser.add_argument("--backend", default="onnx-int8", choices=ENCODER_BACKENDS)
+    parser.add_argument("--sample", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    client = load_qdrant_client()
+    records, _ = client.scroll(
+        collection_name=args.collection,
+        scroll_filter=Filter(
+            must=[
+                {"key": "code_type", "match": {"value": "stem"}},
+                {"key": "is_leaf", "match": {"value": True}},
+                {"key": "name_type", "match": {"value": "fsn"}},
+            ]
+        ),
+        limit=args.sample,
+        with_payload=["concept_name", "code"],
+        with_vectors=True,
+    )
+    texts = [r.payload["concept_name"] for r in records]
+    stored = np.asarray([r.vector for r in records], dtype=np.float32)
+    stored /= np.linalg.norm(stored, axis=1, keepdims=True)
+
+    baseline = load_encoder(args.uri, "torch")
+    candidate = load_encoder(args.uri, args.backend)
+    for model in (baseline, candidate):
+        model.encode(texts[:4], normalize_embeddings=True)  # aquecimento
+    baseline_vectors, baseline_ms = timed_encode(baseline, texts)
+    candidate_vectors, candidate_ms = timed_encode(candidate, texts)
+
+    cosines = (stored * candidate_vectors).sum(axis=1)
+    overlaps = [
+        len(neighbor_codes(client, args.collection, s.tolist(), args.k)
+            & neighbor_codes(client, args.collection, c.tolist(), args.k)) / args.k
+        for s, c in zip(stored, candidate_vectors)
+    ]
+
+    print(f"📊 {args.collection} | {args.uri} | backend={args.backend} | {len(texts)} FSNs")
+    print(f"🧭 Cosine vs stored fp32: mean={cosines.mean():.4f} min={cosines.min():.4f}")
+    print(f"🎯 Neighbor overlap@{args.k}: mean={statistics.mean(overlaps):.1%} min={min(overlaps):.1%}")
+    print(f"⏱️ Encode latency: torch fp32={baseline_ms:.2f} ms/text, {args.backend}={candidate_ms:.2f} ms/text "
+          f"({baseline_ms / candidate_ms:.2f}x)")
+    print(f"🔎 torch fp32 vs stored cosine (sanity): {(stored * baseline_vectors).sum(axis=1).mean():.4f}")
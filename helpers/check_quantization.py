@@ -0,0 +1,107 @@
+"""
+Relatório recall@K / latência / memória de uma coleção quantizada (int8,
+binary) ou float16 contra a busca não quantizada.
+
+Referência (ground truth):
+- sem --baseline: busca exata nos vetores originais da própria coleção
+  (válido para int8/binary, que mantêm os originais para o rescore)
+- com --baseline: a coleção float32 equivalente (necessário para float16)
+
+As queries são vetores de sinônimos de stems folha lidos da coleção de
+referência; a busca é a mesma do V3 (group-by ``code``, top-K códigos
+distintos). Para cada oversampling informado mede quantos dos top-K códigos
+são mantidos e em quantas queries o top-K sai idêntico (mesma ordem).
+
+Uso:
+    python helpers/check_quantization.py --collection icd11_concepts_mpnet --storage int8
+    python helpers/check_quantization.py --collection icd11_concepts_mpnet_f16 --storage float16 \\
+        --baseline icd11_concepts_mpnet
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+from qdrant_client.http.models import Filter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from helpers.model_loader import load_qdrant_client
+from helpers.qdrant_config import PROFILES, STORAGE_OPTIONS, memory_estimate_mb, search_params
+
+STEM_FILTER = Filter(
+    must=[
+        {"key": "code_type", "match": {"value": "stem"}},
+        {"key": "is_leaf", "match": {"value": True}},
+    ]
+)
+
+
+def top_codes(client, collection_name, vector, k, params):
+    start = time.perf_counter()
+    response = client.query_points_groups(
+        collection_name=collection_name,
+        query=vector,
+        group_by="code",
+        limit=k,
+        group_size=1,
+        with_payload=False,
+        query_filter=STEM_FILTER,
+        search_params=params,
+    )
+    return [group.id for group in response.groups], (time.perf_counter() - start) * 1000
+
+
+def vector_dim(client, collection_name):
+    vectors = client.get_collection(collection_name).config.params.vectors
+    return vectors.size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", required=True)
+    parser.add_argument("--storage", choices=STORAGE_OPTIONS, required=True)
+    parser.add_argument("--baseline", help="float32 collection used as ground truth")
+    parser.add_argument("--oversampling", default="1,2,3,4", help="Comma-separated values (quantized only)")
+    parser.add_argument("--no-rescore", action="store_true")
+    parser.add_argument("--profile", choices=tuple(PROFILES), default="default", help="Profile whose hnsw_ef is used")
+    parser.add_argument("--sample", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    client = load_qdrant_client()
+    baseline = args.baseline or args.collection
+    records, _ = client.scroll(
+        collection_name=baseline,
+        scroll_filter=Filter(
+            must=STEM_FILTER.must,
+            must_not=[{"key": "name_type", "match": {"value": "fsn"}}],
+        ),
+        limit=args.sample,
+        with_vectors=True,
+    )
+    vectors = [r.vector for r in records]
+
+    exact = search_params(exact=True) if baseline == args.collection else None
+    truth, truth_ms = zip(*(top_codes(client, baseline, v, args.k, exact) for v in vectors))
+
+    points = client.get_collection(args.collection).points_count
+    dim = vector_dim(client, args.collection)
+    print(f"📊 {args.collection} [{args.storage}] vs {baseline} ({'exact' if exact else 'float32'}) | "
+          f"{len(vectors)} queries | top-{args.k} codes")
+    print(f"💾 Vector RAM: float32≈{memory_estimate_mb(points, dim):.1f} MB -> "
+          f"{args.storage}≈{memory_estimate_mb(points, dim, args.storage):.1f} MB ({points} points x {dim})")
+    print(f"⏱️ Reference search: mean={statistics.mean(truth_ms):.2f} ms")
+
+    settings = [float(o) for o in args.oversampling.split(",")] if args.storage in ("int8", "binary") else [None]
+    for oversampling in settings:
+        params = search_params(
+            args.storage, oversampling=oversampling, rescore=not args.no_rescore, profile=args.profile
+        )
+        found, latencies = zip(*(top_codes(client, args.collection, v, args.k, params) for v in vectors))
+        recall = statistics.mean(len(set(f) & set(t)) / max(len(t), 1) for f, t in zip(found, truth))
+        stable = statistics.mean(f == t for f, t in zip(found, truth))
+        label = f"oversampling={oversampling}" if oversampling else args.storage
+        print(f"🎯 {label:<18} recall@{args.k}={recall:.1%} identical top-{args.k}={stable:.1%} "
+              f"mean={statistics.mean(latencies):.2f} ms")
@@ -0,0 +1,283 @@
+"""
+Artefatos portáveis de embeddings pré-computados: exporta as coleções do
+Qdrant para shards ``.npy`` versionados (o mesmo layout do índice local,
+``helpers/local_index.py``) e importa esses shards num Qdrant novo ou no
+índice local, sem carregar nenhum encoder.
+
+Layout:
+
+    <root>/LATEST                      # versão mais recente exportada
+    <root>/<versão>/artifact.json      # coleções, contagens, dimensões, origem
+    <root>/<versão>/<coleção>/         # manifest.json + vectors-*.npy + payloads-*.jsonl
+    <root>/<versão>/<coleção>.snapshot # snapshot do Qdrant (opcional, --snapshot)
+
+Uso:
+    python helpers/embedding_artifacts.py export --root ./artifacts [--snapshot]
+    python helpers/embedding_artifacts.py import --root ./artifacts --to qdrant [--version 20250101-120000]
+    python helpers/embedding_artifacts.py import --root ./artifacts --to local --local-index ./local_index
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+from datetime import datetime, timezone
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from helpers.local_index import MANIFEST, LocalIndexWriter
+from helpers.qdrant_config import (
+    DEFAULT_KEEP_VERSIONS,
+    PROFILES,
+    STORAGE_OPTIONS,
+    active_collection,
+    bulk_load_optimizers,
+    create_collection,
+    new_version,
+    publish_version,
+    vector_params,
+    versioned_name,
+)
+
+QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
+QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
+ARTIFACT = "artifact.json"
+LATEST = "LATEST"
+DEFAULT_COLLECTIONS = [
+    "icd11_concepts_minilm",
+    "icd11_concepts_mpnet",
+    "icd11_concepts_biobert",
+    "icd11_concepts_sapbert",
+]
+SCROLL_BATCH = 1024
+
+
+def server_url():
+    return f"http://{QDRANT_HOST}:{QDRANT_PORT}"
+
+
+def export_collection(client, collection_name, source, version_dir, version):
+    vectors_config = client.get_collection(source).config.params.vectors
+    if isinstance(vectors_config, dict):
+        raise ValueError(
+            f"{collection_name} has named vectors; export it with --snapshot or rebuild it with --multivector"
+        )
+    writer = LocalIndexWriter(version_dir, collection_name, vectors_config.size)
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=source,
+            limit=SCROLL_BATCH,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if records:
+            writer.add(
+                [r.id for r in records],
+                np.asarray([r.vector for r in records], dtype=np.float32),
+                [r.payload or {} for r in records],
+            )
+        if offset is None:
+            break
+    writer.close(source=source, version=version)
+    return {"count": writer.count, "dim": vectors_config.size}
+
+
+def download_snapshot(client, collection_name, source, version_dir):
+    import httpx
+
+    snapshot = client.create_snapshot(collection_name=source)
+    path = os.path.join(version_dir, f"{collection_name}.snapshot")
+    url = f"{server_url()}/collections/{source}/snapshots/{snapshot.name}"
+    with httpx.stream("GET", url, timeout=None) as response, open(path, "wb") as f:
+        response.raise_for_status()
+        for chunk in response.iter_bytes(1 << 20):
+            f.write(chunk)
+    return os.path.basename(path)
+
+
+def export_artifacts(args, client):
+    version = args.version or datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    version_dir = os.path.join(args.root, version)
+    os.makedirs(version_dir, exist_ok=True)
+    artifact = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "source": args.qdrant_path or server_url(),
+        "collections": {},
+    }
+    for collection_name in args.collections:
+        start = time.time()
+        # Exporta a versão servida pelo alias, com o nome estável no artefato
+        source = active_collection(client, collection_name)
+        if source is None:
+            raise ValueError(f"Collection or alias not found: {collection_name}")
+        entry = {"source": source}
+        if args.snapshot:
+            entry["snapshot"] = download_snapshot(client, collection_name, source, version_dir)
+        try:
+            entry.update(export_collection(client, collection_name, source, version_dir, version))
+        except ValueError as error:
+            if not args.snapshot:
+                raise
+            print(f"⚠️ {error}")
+        artifact["collections"][collection_name] = entry
+        print(f"📦 [{collection_name}] Exported {entry} in {time.time() - start:.2f} seconds.")
+
+    with open(os.path.join(version_dir, ARTIFACT), "w") as f:
+        json.dump(artifact, f, indent=2)
+    with open(os.path.join(args.root, LATEST), "w") as f:
+        f.write(version)
+    print(f"🏁 Artifacts version {version} written to {version_dir}")
+
+
+def iter_shards(collection_dir):
+    """Gera (ids, vetores mmap, payloads) de cada shard exportado."""
+    with open(os.path.join(collection_dir, MANIFEST)) as f:
+        manifest = json.load(f)
+    for shard in manifest["shards"]:
+        vectors = np.load(os.path.join(collection_dir, shard["vectors"]), mmap_mode="r")
+        ids, payloads = [], []
+        with open(os.path.join(collection_dir, shard["payloads"])) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    ids.append(record["id"])
+                    payloads.append(record["payload"])
+        yield ids, vectors, payloads
+
+
+def import_to_local(collection_name, collection_dir, local_index):
+    # Os shards já estão no layout do índice local: basta copiá-los
+    target = os.path.join(local_index, collection_name)
+    staging = f"{target}.importing"
+    shutil.rmtree(staging, ignore_errors=True)
+    shutil.copytree(collection_dir, staging)
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    os.replace(staging, target)
+
+
+def upload_snapshot(collection_name, path):
+    import httpx
+
+    with open(path, "rb") as f:
+        response = httpx.post(
+            f"{server_url()}/collections/{collection_name}/snapshots/upload",
+            params={"priority": "snapshot", "wait": "true"},
+            files={"snapshot": (os.path.basename(path), f)},
+            timeout=None,
+        )
+    response.raise_for_status()
+
+
+def import_to_qdrant(client, target, collection_dir, entry, args):
+    create_collection(client, target, vector_params(entry["dim"], args.storage, args.profile), args.profile)
+    client.update_collection(collection_name=target, optimizers_config=bulk_load_optimizers(True))
+    try:
+        for ids, vectors, payloads in iter_shards(collection_dir):
+            client.upload_collection(
+                collection_name=target,
+                vectors=vectors,
+                payload=payloads,
+                ids=ids,
+                batch_size=256,
+                parallel=args.workers,
+            )
+    finally:
+        client.update_collection(collection_name=target, optimizers_config=bulk_load_optimizers(False))
+
+
+def import_artifacts(args, client):
+    version = args.version
+    if version is None:
+        with open(os.path.join(args.root, LATEST)) as f:
+            version = f.read().strip()
+    version_dir = os.path.join(args.root, version)
+    with open(os.path.join(version_dir, ARTIFACT)) as f:
+        artifact = json.load(f)
+
+    for collection_name, entry in artifact["collections"].items():
+        if args.collections and collection_name not in args.collections:
+            continue
+        collection_dir = os.path.join(version_dir, collection_name)
+        snapshot = args.to == "qdrant" and args.use_snapshot and entry.get("snapshot")
+        if not snapshot and "dim" not in entry:
+            print(f"⚠️ [{collection_name}] Only a snapshot was exported; pass --to qdrant --use-snapshot")
+            continue
+        start = time.time()
+        if args.to == "local":
+            import_to_local(collection_name, collection_dir, args.local_index)
+        else:
+            # Carrega numa versão nova e só então troca o alias (blue/green)
+            target = versioned_name(collection_name, new_version())
+            try:
+                if snapshot:
+                    upload_snapshot(target, os.path.join(version_dir, entry["snapshot"]))
+                else:
+                    import_to_qdrant(client, target, collection_dir, entry, args)
+            except BaseException:
+                if client.collection_exists(collection_name=target):
+                    client.delete_collection(collection_name=target)
+                raise
+            previous, dropped = publish_version(client, collection_name, target, args.keep_versions)
+            print(f"🔀 [{collection_name}] Alias now serves {target} (previous: {previous or 'none'})")
+            for name in dropped:
+                print(f"🗑️ [{collection_name}] Dropped old version {name}")
+        duration = time.time() - start
+        count = entry.get("count", 0)
+        print(
+            f"✅ [{collection_name}] Imported {count} points ({args.to}) in {duration:.2f} seconds "
+            f"({count / max(duration, 1e-9):.0f} pts/s)."
+        )
+    print(f"🏁 Artifacts version {version} imported")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Export Qdrant collections to versioned .npy shards")
+    export_parser.add_argument("--version", help="Artifact version (default: UTC timestamp)")
+    export_parser.add_argument("--snapshot", action="store_true", help="Also download a Qdrant snapshot")
+
+    import_parser = commands.add_parser("import", help="Load exported shards into Qdrant or the local index")
+    import_parser.add_argument("--version", help="Artifact version (default: LATEST)")
+    import_parser.add_argument("--to", choices=("qdrant", "local"), default="qdrant")
+    import_parser.add_argument("--local-index", default=os.getenv("LOCAL_INDEX_PATH", "./local_index"))
+    import_parser.add_argument("--use-snapshot", action="store_true", help="Restore the Qdrant snapshot when present")
+    import_parser.add_argument("--storage", choices=STORAGE_OPTIONS, default="float32")
+    import_parser.add_argument("--profile", choices=tuple(PROFILES), default="default")
+    import_parser.add_argument("--workers", type=int, default=4, help="Parallel upload processes")
+    import_parser.add_argument(
+        "--keep-versions", type=int, default=DEFAULT_KEEP_VERSIONS, help="Previous versions kept for rollback"
+    )
+
+    for command in (export_parser, import_parser):
+        command.add_argument("--root", default="./artifacts")
+        command.add_argument("--qdrant-path", help="Embedded Qdrant (local/path mode) instead of QDRANT_HOST:QDRANT_PORT")
+        command.add_argument("--collections", type=lambda v: v.split(","), help="Comma-separated collection names")
+
+    args = parser.parse_args()
+    if args.qdrant_path and (getattr(args, "snapshot", False) or getattr(args, "use_snapshot", False)):
+        parser.error("snapshots are transferred over the Qdrant HTTP API; they need QDRANT_HOST:QDRANT_PORT")
+    if args.command == "export" and not args.collections:
+        args.collections = DEFAULT_COLLECTIONS
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    client = None
+    if args.command == "export" or args.to == "qdrant":
+        client = QdrantClient(path=args.qdrant_path) if args.qdrant_path else QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+
+    if args.command == "export":
+        export_artifacts(args, client)
+    else:
+        import_artifacts(args, client)
@@ -0,0 +1,54 @@
+"""
+Manutenção do cache de embeddings em disco (EMBEDDING_CACHE_PATH): lista os
+fingerprints de encoder guardados e remove vetores por idade ou por
+fingerprint. Os workers não apagam fingerprints uns dos outros; vetores sem
+uso expiram sozinhos após EMBEDDING_CACHE_TTL_DAYS.
+
+Uso:
+    python helpers/embedding_cache_admin.py list
+    python helpers/embedding_cache_admin.py purge --days 7
+    python helpers/embedding_cache_admin.py purge --model-key "pritamdeka/S-PubMedBert-MS-MARCO@0123456789abcdef"
+"""
+
+import os
+import sys
+import time
+import argparse
+import importlib.util
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_embedding_cache_module():
+    # Carrega só o módulo do cache: importar o pacote V3 montaria o grafo e os encoders
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "V3", "embedding_cache.py")
+    spec = importlib.util.spec_from_file_location("embedding_cache", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=os.getenv("EMBEDDING_CACHE_PATH"), help="SQLite file (EMBEDDING_CACHE_PATH)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Fingerprints stored, with row count and last use")
+    purge = commands.add_parser("purge", help="Drop vectors by age and/or fingerprint")
+    purge.add_argument("--days", type=float, help="Drop vectors unused for this many days")
+    purge.add_argument("--model-key", action="append", default=[], help="Fingerprint to drop (repeatable)")
+    args = parser.parse_args()
+
+    if not args.path or not os.path.exists(args.path):
+        sys.exit(f"❌ Embedding cache not found: {args.path} (set EMBEDDING_CACHE_PATH or --path)")
+    cache = load_embedding_cache_module().EmbeddingCache(disk_path=args.path)
+
+    if args.command == "list":
+        for model_key, uri, rows, last_used in cache.fingerprints():
+            age_days = (time.time() - last_used) / 86400
+            print(f"🗃️ {model_key}: {rows} vectors, last used {age_days:.1f} days ago")
+    else:
+        if args.days is None and not args.model_key:
+            parser.error("purge needs --days and/or --model-key")
+        max_age = args.days * 86400 if args.days is not None else None
+        deleted = cache.purge(max_age=max_age, model_keys=args.model_key)
+        print(f"🧹 Embedding cache: dropped {deleted} vectors")
@@ -0,0 +1,180 @@
+"""
+Backends de encoder para as coleções:
+- "torch": SentenceTransformer em PyTorch fp32 (padrão)
+- "onnx": SentenceTransformer com ONNX Runtime (exportado na primeira carga)
+- "onnx-int8": ONNX com quantização dinâmica int8 (gerada e salva em ONNX_CACHE_DIR)
+- "fastembed": fastembed (ONNX Runtime); modelos fora da lista embutida do
+  fastembed são exportados para ONNX e registrados como modelos customizados
+"""
+
+import os
+import re
+import json
+import threading
+from typing import List, Union
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8", "fastembed")
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", "./models/onnx")
+# Configuração de quantização do ONNX Runtime: "arm64", "avx2", "avx512" ou "avx512_vnni"
+ONNX_QUANTIZATION = os.getenv("ONNX_QUANTIZATION", "avx2")
+
+
+def _export_dir(uri: str) -> str:
+    return os.path.join(ONNX_CACHE_DIR, re.sub(r"[^\w.-]", "__", uri))
+
+
+def _export_onnx(uri: str) -> str:
+    """Exporta (uma vez) o SentenceTransformer para ONNX fp32; devolve o diretório do export."""
+    save_dir = _export_dir(uri)
+    if not os.path.exists(os.path.join(save_dir, "onnx", "model.onnx")):
+        print(f"📦 Exporting {uri} to ONNX in {save_dir}...")
+        SentenceTransformer(uri, device="cpu", backend="onnx").save(save_dir)
+    return save_dir
+
+
+_fastembed_lock = threading.Lock()
+_fastembed_custom: set = set()
+
+
+def _register_fastembed_model(uri: str) -> str:
+    """
+    Registra ``uri`` no fastembed a partir do export ONNX, com o mesmo pooling
+    e normalização do SentenceTransformer (os vetores gravados nas coleções).
+    Devolve o diretório do modelo.
+    """
+    from fastembed import TextEmbedding
+
+    try:
+        from fastembed.common.model_description import ModelSource, PoolingType
+    except ImportError:
+        raise ValueError(
+            f"{uri} is not one of fastembed's built-in models and this fastembed version cannot register "
+            "custom models; upgrade fastembed (>= 0.5.1) or use ENCODER_BACKEND=onnx"
+        ) from None
+
+    with _fastembed_lock:
+        save_dir = _export_dir(uri)
+        if uri in _fastembed_custom:
+            return save_dir
+        _export_onnx(uri)
+        with open(os.path.join(save_dir, "modules.json")) as f:
+            modules = json.load(f)
+        pooling_module = next(m for m in modules if m["type"].endswith("Pooling"))
+        with open(os.path.join(save_dir, pooling_module["path"], "config.json")) as f:
+            pooling_config = json.load(f)
+        if pooling_config.get("pooling_mode_cls_token"):
+            pooling = PoolingType.CLS
+        elif pooling_config.get("pooling_mode_mean_tokens"):
+            pooling = PoolingType.MEAN
+        else:
+            raise ValueError(f"{uri}: only CLS or mean pooling can run on fastembed, got {pooling_config}")
+
+        TextEmbedding.add_custom_model(
+            model=uri,
+            pooling=pooling,
+            normalization=any(m["type"].endswith("Normalize") for m in modules),
+            sources=ModelSource(hf=uri),
+            dim=pooling_config["word_embedding_dimension"],
+            model_file="onnx/model.onnx",
+        )
+        _fastembed_custom.add(uri)
+        return save_dir
+
+
+class FastEmbedEncoder:
+    """
+    Adapta ``fastembed.TextEmbedding`` à interface ``encode`` do SentenceTransformer.
+    Modelos fora da lista do fastembed rodam a partir do export ONNX local.
+    """
+
+    def __init__(self, uri: str):
+        from fastembed import TextEmbedding
+
+        self.uri = uri
+        builtin = {m["model"].lower() for m in TextEmbedding.list_supported_models()}
+        if uri.lower() in builtin and uri not in _fastembed_custom:
+            self.model = TextEmbedding(model_name=uri)
+        else:
+            self.model = TextEmbedding(model_name=uri, specific_model_path=_register_fastembed_model(uri))
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        **kwargs,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        vectors = np.stack(list(self.model.embed([sentences] if single else sentences)))
+        if normalize_embeddings:
+            vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors[0] if single else vectors
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return len(self.encode("dimension probe"))
+
+    def __repr__(self) -> str:
+        return f"FastEmbedEncoder({self.uri})"
+
+
+def _int8_onnx_model(uri: str) -> SentenceTransformer:
+    """Exporta (uma vez) o modelo para ONNX int8 dinâmico e carrega a versão quantizada."""
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    save_dir = _export_onnx(uri)
+    file_name = f"onnx/model_qint8_{ONNX_QUANTIZATION}.onnx"
+    if not os.path.exists(os.path.join(save_dir, file_name)):
+        print(f"📦 Quantizing {uri} to int8 ONNX ({ONNX_QUANTIZATION}) in {save_dir}...")
+        model = SentenceTransformer(save_dir, device="cpu", backend="onnx")
+        export_dynamic_quantized_onnx_model(model, ONNX_QUANTIZATION, save_dir)
+    return SentenceTransformer(
+        save_dir, device="cpu", backend="onnx", model_kwargs={"file_name": file_name}
+    )
+
+
+def load_encoder(uri: str, backend: str = "torch", device: str = "cpu"):
+    """Carrega o encoder de ``uri`` no backend pedido; todos expõem ``encode``."""
+    if backend == "torch":
+        return SentenceTransformer(uri, device=device)
+    if backend == "onnx":
+        return SentenceTransformer(uri, device="cpu", backend="onnx")
+    if backend == "onnx-int8":
+        return _int8_onnx_model(uri)
+    if backend == "fastembed":
+        return FastEmbedEncoder(uri)
+    raise ValueError(f"Unknown encoder backend '{backend}', expected one of {ENCODER_BACKENDS}")
+
+
+class ProcessPoolEncoder:
+    """
+    Encoda com ``processes`` workers do SentenceTransformer em CPU (pool
+    multi-processo), cada um limitado a ``threads_per_process`` threads para não
+    disputar os núcleos. Cada lote é dividido em pedaços de ``chunk_size`` textos,
+    os mesmos lotes do caminho de processo único, então o padding é idêntico.
+    """
+
+    def __init__(self, model: SentenceTransformer, processes: int, threads_per_process: int = 1, chunk_size: int = 64):
+        self.model = model
+        self.processes = processes
+        self.chunk_size = chunk_size
+        # Os workers (spawn) leem OMP_NUM_THREADS ao importar o torch
+        previous = os.environ.get("OMP_NUM_THREADS")
+        os.environ["OMP_NUM_THREADS"] = str(threads_per_process)
+        try:
+            self.pool = model.start_multi_process_pool(target_devices=["cpu"] * processes)
+        finally:
+            if previous is None:
+                os.environ.pop("OMP_NUM_THREADS", None)
+            else:
+                os.environ["OMP_NUM_THREADS"] = previous
+
+    def encode(self, sentences: List[str]) -> np.ndarray:
+        return self.model.encode_multi_process(
+            sentences, self.pool, batch_size=self.chunk_size, chunk_size=self.chunk_size
+        )
+
+    def close(self) -> None:
+        SentenceTransformer.stop_multi_process_pool(self.pool)
@@ -0,0 +1,311 @@
+"""
+Catálogo ICD-11 em memória para lookups por código (FSN, is_leaf,
+leaf_related_codes, opções de pós-coordenação) sem ir ao Qdrant.
+
+É construído a partir do mesmo JSON lido pelo ``populate_qdrant.py`` e pode
+ser compilado num arquivo binário compacto que é aberto via ``mmap``:
+apenas a tabela de códigos fica residente e cada registro é decodificado
+sob demanda.
+
+Uso:
+    python -m helpers.icd11_catalog build [icd11_vector_input.json] [icd11_catalog.bin]
+    python -m helpers.icd11_catalog stats [icd11_catalog.bin]
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import struct
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+JSON_PATH = "icd11_vector_input.json"
+CATALOG_PATH = "icd11_catalog.bin"
+
+def iter_json_items(json_path: str = JSON_PATH):
+    """
+    Itera os itens do array JSON de entrada sem carregar o arquivo inteiro
+    (``ijson``); sem ijson instalado, cai no ``json.load``.
+    """
+    try:
+        import ijson
+    except ImportError:
+        with open(json_path, "r") as f:
+            yield from json.load(f)
+        return
+    with open(json_path, "rb") as f:
+        # use_float: números como float em vez de Decimal (payloads JSON-serializáveis)
+        yield from ijson.items(f, "item", use_float=True)
+
+
+# Formato: MAGIC | count (u32) | tamanho do blob de códigos (u32) | códigos
+# ordenados separados por "\n" | offsets (u64 * count+1) | registros JSON
+MAGIC = b"ICD11CT1"
+HEADER = struct.Struct("<8sII")
+
+
+class CatalogEntry(NamedTuple):
+    code: str
+    fsn: str
+    code_type: str
+    is_leaf: bool
+    leaf_related_codes: Tuple[str, ...]
+    postcoordination_options: Tuple[dict, ...]
+
+
+def _entry_from_record(code: str, record: dict) -> CatalogEntry:
+    return CatalogEntry(
+        code=code,
+        fsn=record["fsn"],
+        code_type=sys.intern(record["code_type"]),
+        is_leaf=record["is_leaf"],
+        leaf_related_codes=tuple(record["leaf_related_codes"]),
+        postcoordination_options=tuple(record["postcoordination_options"]),
+    )
+
+
+def _deep_sizeof(obj, seen=None) -> int:
+    """Estimativa do footprint de um objeto Python (containers recursivos)."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(i, seen) for i in obj)
+    return size
+
+
+class ICD11Catalog:
+    """
+    Lookups O(1) (modo eager) ou O(log n) (modo mmap) por código ICD-11.
+    """
+
+    def __init__(self, entries: Dict[str, CatalogEntry], source: str, load_seconds: float):
+        self._entries = entries
+        self._codes: List[str] = []
+        self._offsets: Optional[array] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._records_start = 0
+        self.source = source
+        self.load_seconds = load_seconds
+        # Cache de registros decodificados do modo mmap, por instância (um
+        # lru_cache no método manteria todas as instâncias vivas)
+        self._get_mapped = lru_cache(maxsize=4096)(self._find_mapped)
+
+    # ------------------------------------------------------------------
+    # Construção / persistência
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_json(cls, json_path: str = JSON_PATH) -> "ICD11Catalog":
+        start = time.perf_counter()
+        records: Dict[str, dict] = {}
+        for item in iter_json_items(json_path):
+            metadata = item["metadata"]
+            code = metadata.get("code")
+            if not code:
+                continue
+            is_fsn = metadata.get("name_type") == "fsn"
+            if code in records and not is_fsn:
+                continue
+            records[code] = {
+                "fsn": item["concept_name"].strip() if is_fsn else "",
+                "code_type": metadata.get("code_type", ""),
+                "is_leaf": bool(metadata.get("is_leaf", False)),
+                "leaf_related_codes": [
+                    rel.strip() for rel in metadata.get("leaf_related_codes", []) if rel
+                ],
+                "postcoordination_options": metadata.get("postcoordination_options", []),
+            }
+
+        entries = {
+            sys.intern(code): _entry_from_record(code, record)
+            for code, record in records.items()
+        }
+        return cls(entries, json_path, time.perf_counter() - start)
+
+    def save(self, path: str = CATALOG_PATH) -> None:
+        codes = sorted(self._iter_codes())
+        codes_blob = "\n".join(codes).encode("utf-8")
+        records = [
+            json.dumps(
+                {
+                    "fsn": entry.fsn,
+                    "code_type": entry.code_type,
+                    "is_leaf": entry.is_leaf,
+                    "leaf_related_codes": list(entry.leaf_related_codes),
+                    "postcoordination_options": list(entry.postcoordination_options),
+                },
+                separators=(",", ":"),
+                ensure_ascii=False,
+            ).encode("utf-8")
+            for entry in (self.get(code) for code in codes)
+        ]
+        offsets = array("Q", [0])
+        for record in records:
+            offsets.append(offsets[-1] + len(record))
+
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(codes), len(codes_blob)))
+            f.write(codes_blob)
+            f.write(offsets.tobytes())
+            for record in records:
+                f.write(record)
+
+    @classmethod
+    def load(cls, path: str = CATALOG_PATH, use_mmap: bool = True) -> "ICD11Catalog":
+        """
+        Abre um catálogo compilado. Com ``use_mmap`` apenas os códigos e
+        offsets ficam em memória; sem ele todos os registros são decodificados.
+        """
+        start = time.perf_counter()
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count, codes_len = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an ICD-11 catalog file")
+        cursor = HEADER.size
+        codes = [sys.intern(c) for c in mm[cursor:cursor + codes_len].decode("utf-8").split("\n")] if count else []
+        cursor += codes_len
+        offsets = array("Q")
+        offsets.frombytes(mm[cursor:cursor + 8 * (count + 1)])
+        cursor += 8 * (count + 1)
+
+        catalog = cls({}, path, 0.0)
+        catalog._codes = codes
+        catalog._offsets = offsets
+        catalog._mmap = mm
+        catalog._records_start = cursor
+
+        if not use_mmap:
+            catalog._entries = {code: catalog._read(i) for i, code in enumerate(codes)}
+            catalog._codes, catalog._offsets, catalog._mmap = [], None, None
+            mm.close()
+
+        catalog.load_seconds = time.perf_counter() - start
+        return catalog
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def _iter_codes(self):
+        return self._entries.keys() if self._mmap is None else iter(self._codes)
+
+    def _read(self, index: int) -> CatalogEntry:
+        start = self._records_start + self._offsets[index]
+        end = self._records_start + self._offsets[index + 1]
+        return _entry_from_record(self._codes[index], json.loads(self._mmap[start:end]))
+
+    def _find_mapped(self, code: str) -> Optional[CatalogEntry]:
+        index = bisect_left(self._codes, code)
+        if index < len(self._codes) and self._codes[index] == code:
+            return self._read(index)
+        return None
+
+    def get(self, code: str) -> Optional[CatalogEntry]:
+        code = code.strip()
+        if self._mmap is None:
+            return self._entries.get(code)
+        return self._get_mapped(code)
+
+    def __contains__(self, code: str) -> bool:
+        return self.get(code) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries) if self._mmap is None else len(self._codes)
+
+    def fsn_index(self) -> Dict[str, str]:
+        """code -> FSN de todos os códigos que têm FSN."""
+        return {code: entry.fsn for code, entry in ((c, self.get(c)) for c in self._iter_codes()) if entry.fsn}
+
+    def fsn(self, code: str) -> str:
+        entry = self.get(code)
+        return entry.fsn if entry else ""
+
+    def is_leaf(self, code: str) -> bool:
+        entry = self.get(code)
+        return entry.is_leaf if entry else False
+
+    def leaf_related_codes(self, code: str) -> Tuple[str, ...]:
+        entry = self.get(code)
+        return entry.leaf_related_codes if entry else ()
+
+    def postcoordination_options(self, code: str) -> Tuple[dict, ...]:
+        entry = self.get(code)
+        return entry.postcoordination_options if entry else ()
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        if self._mmap is None:
+            resident = _deep_sizeof(self._entries)
+            mapped = 0
+        else:
+            resident = _deep_sizeof(self._codes) + self._offsets.buffer_info()[1] * self._offsets.itemsize
+            mapped = len(self._mmap)
+        return {
+            "codes": len(self),
+            "source": self.source,
+            "mmap": self._mmap is not None,
+            "load_ms": round(self.load_seconds * 1000, 2),
+            "resident_mb": round(resident / 1024 ** 2, 2),
+            "mapped_mb": round(mapped / 1024 ** 2, 2),
+        }
+
+
+def load_catalog() -> Optional[ICD11Catalog]:
+    """
+    Carrega o catálogo do arquivo compilado (ICD11_CATALOG_PATH) ou, na falta
+    dele, do JSON de entrada (ICD11_JSON_PATH). Retorna None se nenhum existir,
+    e os tools voltam a consultar o Qdrant.
+    """
+    catalog_path = os.getenv("ICD11_CATALOG_PATH", CATALOG_PATH)
+    json_path = os.getenv("ICD11_JSON_PATH", JSON_PATH)
+    use_mmap = os.getenv("ICD11_CATALOG_MMAP", "true").lower() in ("1", "true", "yes")
+
+    if os.path.exists(catalog_path):
+        catalog = ICD11Catalog.load(catalog_path, use_mmap=use_mmap)
+    elif os.path.exists(json_path):
+        catalog = ICD11Catalog.from_json(json_path)
+    else:
+        print(f"⚠️ ICD-11 catalog not found ({catalog_path} / {json_path}); falling back to Qdrant lookups")
+        return None
+
+    print(f"📚 ICD-11 catalog loaded: {catalog.stats()}")
+    return catalog
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if command == "build":
+        source = sys.argv[2] if len(sys.argv) > 2 else JSON_PATH
+        target = sys.argv[3] if len(sys.argv) > 3 else CATALOG_PATH
+        catalog = ICD11Catalog.from_json(source)
+        print(f"[json] {catalog.stats()}")
+        catalog.save(target)
+        print(f"✅ Catalog written to {target}")
+        for use_mmap in (True, False):
+            print(f"[{'mmap' if use_mmap else 'eager'}] {ICD11Catalog.load(target, use_mmap=use_mmap).stats()}")
+    elif command == "stats":
+        target = sys.argv[2] if len(sys.argv) > 2 else CATALOG_PATH
+        catalog = ICD11Catalog.load(target)
+        start = time.perf_counter()
+        codes = list(catalog._iter_codes())
+        for code in codes:
+            catalog.get(code)
+        elapsed = time.perf_counter() - start
+        print(catalog.stats())
+        print(f"⏱️ {len(codes)} lookups in {elapsed * 1000:.2f} ms ({elapsed / max(len(codes), 1) * 1e6:.2f} µs/lookup)")
+    else:
+        print(__doc__)
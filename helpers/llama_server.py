@@ -0,0 +1,92 @@
+"""
+Sobe o llama.cpp server (binário ``llama-server``, API compatível com OpenAI)
+com slots paralelos e batching contínuo, para os tools do V3 atenderem várias
+execuções do grafo ao mesmo tempo (LLM_BACKEND=llama-server).
+
+O contexto total é dividido entre os slots, então ``--ctx-size`` é
+``--ctx-per-slot`` x ``--slots``. Use o mesmo número de slots em
+LLAMA_SERVER_SLOTS (tamanho do pool HTTP do lado do V3).
+
+Uso:
+    python helpers/llama_server.py --slots 4
+    python helpers/llama_server.py --model models/DeepSeek-R1-0528-Qwen3-8B-Q4_K_M.gguf --slots 8 --gpu-layers 99
+    LLAMA_SERVER_URL=http://localhost:8080/v1 LLAMA_SERVER_SLOTS=4 langgraph dev
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import subprocess
+import urllib.request
+
+DEFAULT_MODEL_PATH = "models/DeepSeek-R1-0528-Qwen3-8B-Q4_K_M.gguf"
+
+
+def server_command(args):
+    return [
+        args.bin,
+        "--model", args.model,
+        "--alias", args.alias or os.path.basename(args.model),
+        "--host", args.host,
+        "--port", str(args.port),
+        "--parallel", str(args.slots),
+        "--ctx-size", str(args.ctx_per_slot * args.slots),
+        "--cont-batching",
+        "--n-gpu-layers", str(args.gpu_layers),
+        *(["--threads", str(args.threads)] if args.threads else []),
+        *args.extra,
+    ]
+
+
+def wait_ready(url, process, timeout):
+    """Espera o /health responder 200 (modelo carregado) ou o processo morrer."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            pass
+        time.sleep(1)
+    return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.getenv("GGUF_MODEL_PATH", DEFAULT_MODEL_PATH))
+    parser.add_argument("--alias", default=os.getenv("LLAMA_SERVER_MODEL"), help="Model name served (LLAMA_SERVER_MODEL)")
+    parser.add_argument("--slots", type=int, default=int(os.getenv("LLAMA_SERVER_SLOTS", "4")), help="Parallel slots")
+    parser.add_argument("--ctx-per-slot", type=int, default=1536, help="Context per slot (n_ctx of the in-process backend)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--gpu-layers", type=int, default=0)
+    parser.add_argument("--threads", type=int)
+    parser.add_argument("--bin", default=os.getenv("LLAMA_SERVER_BIN", "llama-server"), help="llama-server binary")
+    parser.add_argument("--ready-timeout", type=float, default=300)
+    parser.add_argument("extra", nargs=argparse.REMAINDER, help="Extra llama-server flags after --")
+    args = parser.parse_args()
+    args.extra = [a for a in args.extra if a != "--"]
+
+    if shutil.which(args.bin) is None:
+        sys.exit(f"❌ {args.bin} not found; build llama.cpp (llama-server target) or set LLAMA_SERVER_BIN")
+    if not os.path.exists(args.model):
+        sys.exit(f"❌ Model not found: {args.model}")
+
+    command = server_command(args)
+    print("🚀", " ".join(command))
+    process = subprocess.Popen(command)
+    url = f"http://{args.host}:{args.port}"
+    try:
+        if wait_ready(url, process, args.ready_timeout):
+            print(f"✅ llama.cpp server ready: LLAMA_SERVER_URL={url}/v1 LLAMA_SERVER_SLOTS={args.slots}")
+        elif process.poll() is None:
+            print(f"⚠️ Server not ready after {args.ready_timeout:.0f}s, still waiting on the process")
+        sys.exit(process.wait())
+    except KeyboardInterrupt:
+        process.terminate()
+        sys.exit(process.wait())
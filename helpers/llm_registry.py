@@ -0,0 +1,171 @@
+"""
+Registro de LLMs do processo: cada configuração de modelo (backend + parâmetros
+de construção) é carregada uma única vez e compartilhada por todos os tools.
+
+O ``Llama`` do llama.cpp não aceita chamadas concorrentes, então os handles
+locais serializam as chamadas com um lock; os clientes de API (``ChatOpenAI``)
+são usados sem lock, inclusive o do llama.cpp server local, que atende várias
+requisições em paralelo (slots + batching contínuo).
+
+Para cada modelo o registro guarda o tempo de carga, o RSS que o processo
+ganhou ao carregá-lo e, nos GGUF mapeados em memória, o residente atual do
+arquivo (``/proc/self/smaps``).
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+def process_rss_mb() -> Optional[float]:
+    """RSS atual do processo (MB), via /proc (Linux); None se indisponível."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def mapped_rss_mb(path: str) -> Optional[float]:
+    """Residente (MB) dos mapeamentos de ``path`` no processo, ex.: pesos GGUF via mmap."""
+    path = os.path.realpath(path)
+    total_kb, current = 0, None
+    try:
+        with open("/proc/self/smaps") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 6 and "-" in fields[0]:
+                    current = fields[5]
+                elif fields and fields[0] == "Rss:" and current == path:
+                    total_kb += int(fields[1])
+    except OSError:
+        return None
+    return total_kb / 1024
+
+
+class LLMHandle:
+    """Modelo compartilhado + lock de acesso e métricas de carga."""
+
+    def __init__(self, key: Tuple, model: Any, serialize: bool, load_seconds: float, rss_mb: Optional[float]):
+        self.key = key
+        self.model = model
+        self.lock = threading.RLock() if serialize else None
+        self.load_seconds = load_seconds
+        self.rss_mb = rss_mb
+        self.calls = 0
+
+    @contextmanager
+    def session(self) -> Iterator[Any]:
+        """Uso exclusivo do modelo (quando serializado) durante o bloco."""
+        with self.lock if self.lock is not None else nullcontext():
+            self.calls += 1
+            yield self.model
+
+    def invoke(self, *args, **kwargs) -> Any:
+        with self.session() as model:
+            return model.invoke(*args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        model_path = getattr(self.model, "model_path", None)
+        return {
+            "model": self.key[1],
+            "backend": self.key[0],
+            "load_seconds": round(self.load_seconds, 2),
+            "rss_at_load_mb": None if self.rss_mb is None else round(self.rss_mb, 1),
+            "mapped_rss_mb": None if not model_path else mapped_rss_mb(model_path),
+            "calls": self.calls,
+        }
+
+
+class LLMRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handles: Dict[Tuple, LLMHandle] = {}
+        self._loading: Dict[Tuple, threading.Lock] = {}
+
+    def get(self, key: Tuple, factory: Callable[[], Any], serialize: bool = True) -> LLMHandle:
+        """Handle de ``key``; ``factory`` só roda na primeira vez (uma carga mesmo com threads concorrentes)."""
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is not None:
+                return handle
+            loading = self._loading.setdefault(key, threading.Lock())
+
+        with loading:
+            with self._lock:
+                handle = self._handles.get(key)
+            if handle is not None:
+                return handle
+            rss_before = process_rss_mb()
+            started = time.perf_counter()
+            model = factory()
+            load_seconds = time.perf_counter() - started
+            rss_after = process_rss_mb()
+            rss_mb = None if rss_before is None or rss_after is None else rss_after - rss_before
+            handle = LLMHandle(key, model, serialize, load_seconds, rss_mb)
+            with self._lock:
+                self._handles[key] = handle
+                self._loading.pop(key, None)
+            print(f"🧠 LLM loaded once for this process: {handle.stats()}")
+            return handle
+
+    def llama_cpp(self, model_path: str, setup: Optional[Callable[[Any], None]] = None, **params) -> LLMHandle:
+        """
+        ``ChatLlamaCpp`` compartilhado por configuração; chamadas serializadas.
+        ``setup`` roda uma vez logo após a carga (ex.: instalar o cache de prefixos).
+        """
+        from langchain_community.chat_models import ChatLlamaCpp
+
+        def factory():
+            model = ChatLlamaCpp(model_path=model_path, **params)
+            if setup is not None:
+                setup(model)
+            return model
+
+        key = ("llama.cpp", model_path, tuple(sorted(params.items())))
+        return self.get(key, factory, serialize=True)
+
+    def openai(self, model_name: str, **params) -> LLMHandle:
+        """``ChatOpenAI`` (OpenRouter ou compatível) compartilhado por configuração."""
+        from langchain_openai import ChatOpenAI
+
+        # A chave da API não entra na chave do registro (nem nos logs)
+        key = ("openai", model_name, tuple(sorted((k, v) for k, v in params.items() if k != "openai_api_key")))
+        return self.get(key, lambda: ChatOpenAI(model_name=model_name, **params), serialize=False)
+
+    def llama_server(self, base_url: str, model_name: str, slots: int, timeout: float = 120.0, **params) -> LLMHandle:
+        """
+        ``ChatOpenAI`` apontado para um llama.cpp server (API compatível com
+        OpenAI), sem lock: o servidor agenda as requisições nos seus slots com
+        batching contínuo. O pool HTTP tem uma conexão por slot; requisições
+        além disso esperam uma conexão livre (até ``timeout``) em vez de
+        enfileirar no servidor.
+        """
+        import httpx
+        from langchain_openai import ChatOpenAI
+
+        def factory():
+            limits = httpx.Limits(max_connections=slots, max_keepalive_connections=slots)
+            return ChatOpenAI(
+                model_name=model_name,
+                openai_api_base=base_url,
+                # O llama.cpp server só confere a chave quando sobe com --api-key
+                openai_api_key=os.getenv("LLAMA_SERVER_API_KEY", "sk-no-key-required"),
+                http_client=httpx.Client(limits=limits, timeout=timeout),
+                http_async_client=httpx.AsyncClient(limits=limits, timeout=timeout),
+                **params,
+            )
+
+        key = ("llama-server", model_name, tuple(sorted({**params, "base_url": base_url, "slots": slots, "timeout": timeout}.items())))
+        return self.get(key, factory, serialize=False)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            handles = list(self._handles.values())
+        return [handle.stats() for handle in handles]
+
+
+# Registro único do processo
+llm_registry = LLMRegistry()
@@ -0,0 +1,378 @@
+"""
+Índice vetorial local (NumPy, memory-mapped) com a mesma interface de
+``QdrantClient.query_points`` usada pelos tools do V3.
+
+Layout em disco, um diretório por coleção:
+
+    <root>/<collection>/manifest.json
+    <root>/<collection>/vectors-00000.npy    # float32, linhas normalizadas (L2)
+    <root>/<collection>/payloads-00000.jsonl # {"id": ..., "payload": {...}} por linha
+    <root>/<collection>/code-00000.npy       # uma coluna por campo indexado
+
+A busca é exata (produto interno = cosseno) sobre os shards mapeados em
+memória. Os campos indexados são colunas NumPy de largura fixa (``U`` / bool),
+filtradas com operações vetorizadas (``==`` / ``np.isin``); os payloads
+ficam no JSONL mapeado em memória e só as linhas devolvidas são decodificadas.
+"""
+
+import os
+import json
+import mmap
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from qdrant_client.models import GroupsResult, PointGroup, QueryResponse, ScoredPoint
+
+MANIFEST = "manifest.json"
+SHARD_SIZE = 50_000
+# Campos com coluna NumPy para filtragem vetorizada (os mesmos indexados no Qdrant)
+INDEXED_FIELDS = ("code", "code_type", "name_type", "is_leaf")
+
+
+class LocalIndexWriter:
+    """Escreve uma coleção no layout de shards lido por ``LocalVectorIndex``."""
+
+    def __init__(self, root: str, collection_name: str, dim: int, shard_size: int = SHARD_SIZE):
+        self.path = os.path.join(root, collection_name)
+        self.collection_name = collection_name
+        self.dim = dim
+        self.shard_size = shard_size
+        self.shards: List[dict] = []
+        self._vectors: List[np.ndarray] = []
+        self._records: List[str] = []
+        self._columns: Dict[str, List[Any]] = {field: [] for field in INDEXED_FIELDS}
+        self._pending = 0
+        self.count = 0
+        os.makedirs(self.path, exist_ok=True)
+        for name in os.listdir(self.path):
+            if name == MANIFEST or name.startswith(("vectors-", "payloads-")) or name.split("-")[0] in INDEXED_FIELDS:
+                os.remove(os.path.join(self.path, name))
+
+    def add(self, ids: Iterable[Any], vectors: np.ndarray, payloads: Iterable[dict]) -> None:
+        payloads = list(payloads)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self._vectors.append(vectors / np.where(norms == 0, 1, norms))
+        self._records.extend(
+            json.dumps({"id": point_id, "payload": payload}, ensure_ascii=False)
+            for point_id, payload in zip(ids, payloads)
+        )
+        for payload in payloads:
+            for field in INDEXED_FIELDS:
+                self._columns[field].append(payload.get(field))
+        self._pending += len(vectors)
+        if self._pending >= self.shard_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        index = len(self.shards)
+        vectors_file = f"vectors-{index:05d}.npy"
+        payloads_file = f"payloads-{index:05d}.jsonl"
+        np.save(os.path.join(self.path, vectors_file), np.concatenate(self._vectors))
+        with open(os.path.join(self.path, payloads_file), "w") as f:
+            f.write("\n".join(self._records) + "\n")
+        columns = {}
+        for field, values in self._columns.items():
+            columns[field] = f"{field}-{index:05d}.npy"
+            np.save(os.path.join(self.path, columns[field]), _column(field, values))
+        self.shards.append(
+            {"vectors": vectors_file, "payloads": payloads_file, "columns": columns, "count": self._pending}
+        )
+        self.count += self._pending
+        self._vectors, self._records, self._pending = [], [], 0
+        self._columns = {field: [] for field in INDEXED_FIELDS}
+
+    def close(self, **metadata) -> None:
+        self._flush()
+        with open(os.path.join(self.path, MANIFEST), "w") as f:
+            json.dump(
+                {
+                    "collection": self.collection_name,
+                    "dim": self.dim,
+                    "distance": "cosine",
+                    "count": self.count,
+                    "shards": self.shards,
+                    **metadata,
+                },
+                f,
+                indent=2,
+            )
+
+
+def _column(field: str, values: List[Any]) -> np.ndarray:
+    """Coluna de largura fixa: bool para ``is_leaf``, ``U`` para os demais (ausente = "")."""
+    if field == "is_leaf":
+        return np.array([bool(v) for v in values], dtype=bool)
+    return np.array(["" if v is None else str(v) for v in values], dtype=str if values else "U1")
+
+
+def _map_lines(path: str):
+    """JSONL mapeado em memória + (início, fim) de cada linha, sem decodificar."""
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    ends = np.flatnonzero(np.frombuffer(mm, dtype=np.uint8) == ord("\n"))
+    starts = np.concatenate(([0], ends[:-1] + 1)) if len(ends) else ends
+    return mm, starts, ends
+
+
+class _LocalCollection:
+    def __init__(self, path: str):
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.vectors: List[np.ndarray] = []
+        self._lines = []
+        parts: Dict[str, List[np.ndarray]] = {field: [] for field in INDEXED_FIELDS}
+        for shard in self.manifest["shards"]:
+            self.vectors.append(np.load(os.path.join(path, shard["vectors"]), mmap_mode="r"))
+            mm, starts, ends = _map_lines(os.path.join(path, shard["payloads"]))
+            self._lines.append((mm, starts, ends))
+            stored = shard.get("columns")
+            for field in INDEXED_FIELDS:
+                if stored:
+                    parts[field].append(np.load(os.path.join(path, stored[field]), mmap_mode="r"))
+                else:
+                    # Índice antigo, sem colunas em disco: monta a coluna uma vez
+                    records = (json.loads(mm[a:b])["payload"] for a, b in zip(starts, ends))
+                    parts[field].append(_column(field, [p.get(field) for p in records]))
+        self._shard_starts = np.cumsum([0] + [len(starts) for _, starts, _ in self._lines])
+        self.size = int(self._shard_starts[-1])
+        self.columns: Dict[str, np.ndarray] = {
+            field: chunks[0] if len(chunks) == 1 else np.concatenate(chunks) if chunks else _column(field, [])
+            for field, chunks in parts.items()
+        }
+        self._group_keys: Dict[str, np.ndarray] = {}
+
+    def record(self, row: int) -> dict:
+        """{"id", "payload"} da linha ``row``, decodificado do JSONL mapeado."""
+        shard = int(np.searchsorted(self._shard_starts, row, side="right")) - 1
+        mm, starts, ends = self._lines[shard]
+        local = row - self._shard_starts[shard]
+        return json.loads(mm[starts[local]:ends[local]])
+
+    def column(self, key: str) -> np.ndarray:
+        """Coluna do campo; campos não indexados são montados (uma vez) a partir dos payloads."""
+        if key not in self.columns:
+            self.columns[key] = np.array([self.record(row)["payload"].get(key) for row in range(self.size)], dtype=object)
+        return self.columns[key]
+
+    def group_keys(self, key: str) -> np.ndarray:
+        """Coluna de largura fixa (``U``) do campo para agrupar; "" = sem valor."""
+        column = self.column(key)
+        if column.dtype.kind == "U":
+            return column
+        if key not in self._group_keys:
+            values = ["" if v is None else str(v) for v in column]
+            self._group_keys[key] = np.array(values, dtype=str if values else "U1")
+        return self._group_keys[key]
+
+    def search(self, query: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        scores = np.concatenate([shard @ query for shard in self.vectors]) if self.vectors else np.empty(0)
+        return np.where(mask, scores, -np.inf)
+
+
+def _equals(column: np.ndarray, value: Any) -> np.ndarray:
+    mask = np.asarray(column == value, dtype=bool)
+    return mask if mask.ndim else np.full(len(column), bool(mask))
+
+
+def _isin(column: np.ndarray, values: Iterable[Any]) -> np.ndarray:
+    values = list(values)
+    if not values:
+        return np.zeros(len(column), dtype=bool)
+    if column.dtype != object:
+        return np.isin(column, np.asarray(values))
+    # Coluna genérica (campo não indexado): comparação em Python
+    values = set(values)
+    return np.fromiter((v in values for v in column), dtype=bool, count=len(column))
+
+
+def _as_dict(obj: Any) -> Any:
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(exclude_none=True)
+    return obj
+
+
+class LocalVectorIndex:
+    """
+    Backend de busca sem servidor, compatível com o subconjunto da API do
+    ``QdrantClient`` usado pelos tools (``query_points``, ``query_points_groups``
+    + filtros ``must`` / ``should`` / ``must_not`` com ``match`` ``value`` /
+    ``any`` / ``except``).
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._collections: Dict[str, _LocalCollection] = {}
+
+    def _collection(self, name: str) -> _LocalCollection:
+        if name not in self._collections:
+            path = os.path.join(self.root, name)
+            if not os.path.exists(os.path.join(path, MANIFEST)):
+                raise ValueError(f"Local index collection not found: {path}")
+            self._collections[name] = _LocalCollection(path)
+        return self._collections[name]
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return os.path.exists(os.path.join(self.root, collection_name, MANIFEST))
+
+    # ------------------------------------------------------------------
+    # Filtros
+    # ------------------------------------------------------------------
+
+    def _condition_mask(self, collection: _LocalCollection, condition: Any) -> np.ndarray:
+        condition = _as_dict(condition)
+        if any(k in condition for k in ("must", "should", "must_not")):
+            return self._filter_mask(collection, condition)
+
+        key, match = condition["key"], _as_dict(condition.get("match", {}))
+        column = collection.column(key)
+
+        if "value" in match:
+            return _equals(column, match["value"])
+        if "any" in match:
+            return _isin(column, match["any"])
+        excluded = match.get("except_", match.get("except"))
+        if excluded is not None:
+            return ~_isin(column, excluded)
+        raise TypeError(f"Unsupported condition for local index: {condition}")
+
+    def _filter_mask(self, collection: _LocalCollection, query_filter: Any) -> np.ndarray:
+        mask = np.ones(collection.size, dtype=bool)
+        if query_filter is None:
+            return mask
+        query_filter = _as_dict(query_filter)
+        for condition in query_filter.get("must") or []:
+            mask &= self._condition_mask(collection, condition)
+        should = query_filter.get("should") or []
+        if should:
+            any_mask = np.zeros(collection.size, dtype=bool)
+            for condition in should:
+                any_mask |= self._condition_mask(collection, condition)
+            mask &= any_mask
+        for condition in query_filter.get("must_not") or []:
+            mask &= ~self._condition_mask(collection, condition)
+        return mask
+
+    @staticmethod
+    def _select_payload(payload: dict, with_payload: Any) -> Optional[dict]:
+        if with_payload is True:
+            return payload
+        if not with_payload:
+            return None
+        return {k: payload[k] for k in with_payload if k in payload}
+
+    # ------------------------------------------------------------------
+    # Busca
+    # ------------------------------------------------------------------
+
+    def query_points(
+        self,
+        collection_name: str,
+        query: Optional[List[float]] = None,
+        query_filter: Any = None,
+        limit: int = 10,
+        offset: Optional[int] = None,
+        with_payload: Any = True,
+        **kwargs,
+    ) -> QueryResponse:
+        if kwargs.get("prefetch"):
+            raise ValueError(
+                "Multi-vector prefetch/fusion needs a Qdrant backend (QDRANT_BACKEND=http or local)"
+            )
+        collection = self._collection(collection_name)
+        mask = self._filter_mask(collection, query_filter)
+        offset = offset or 0
+
+        if query is None:
+            # Sem vetor: como no Qdrant, devolve os pontos filtrados por ordem de id
+            rows = np.flatnonzero(mask)[offset:offset + limit]
+            scores = np.zeros(len(rows))
+        else:
+            all_scores = collection.search(np.asarray(query, dtype=np.float32), mask)
+            top = min(offset + limit, int(mask.sum()))
+            if top <= 0:
+                return QueryResponse(points=[])
+            candidates = np.argpartition(-all_scores, top - 1)[:top]
+            rows = candidates[np.argsort(-all_scores[candidates], kind="stable")][offset:]
+            scores = all_scores[rows]
+
+        points = []
+        for row, score in zip(rows, scores):
+            record = collection.record(row)
+            points.append(
+                ScoredPoint(
+                    id=record["id"],
+                    version=0,
+                    score=float(score),
+                    payload=self._select_payload(record["payload"], with_payload),
+                )
+            )
+        return QueryResponse(points=points)
+
+    def query_points_groups(
+        self,
+        collection_name: str,
+        group_by: str,
+        query: Optional[List[float]] = None,
+        query_filter: Any = None,
+        limit: int = 10,
+        group_size: int = 3,
+        with_payload: Any = True,
+        **kwargs,
+    ) -> GroupsResult:
+        if kwargs.get("prefetch"):
+            raise ValueError(
+                "Multi-vector prefetch/fusion needs a Qdrant backend (QDRANT_BACKEND=http or local)"
+            )
+        collection = self._collection(collection_name)
+        keys = collection.group_keys(group_by)
+        mask = self._filter_mask(collection, query_filter) & (keys != "")
+        all_scores = collection.search(np.asarray(query, dtype=np.float32), mask)
+        available = int(mask.sum())
+        if available == 0 or limit <= 0:
+            return GroupsResult(groups=[])
+
+        # Top-N parcial; cresce N até aparecerem ``limit`` grupos (ou acabarem os pontos)
+        top = min(available, limit * group_size)
+        while True:
+            candidates = np.argpartition(-all_scores, top - 1)[:top]
+            candidates = candidates[np.argsort(-all_scores[candidates], kind="stable")]
+            values, first, counts = np.unique(keys[candidates], return_index=True, return_counts=True)
+            if len(values) >= limit or top == available:
+                break
+            top = min(available, top * 4)
+
+        # Grupos na ordem do melhor score (primeira aparição entre os candidatos)
+        ranked = np.argsort(first, kind="stable")[:limit]
+        selected = values[ranked]
+        if top < available and (counts[ranked] < group_size).any():
+            # Grupo incompleto no top-N: os demais pontos dele ficaram abaixo do corte
+            rows = np.flatnonzero(mask & np.isin(keys, selected))
+            rows = rows[np.argsort(-all_scores[rows], kind="stable")]
+        else:
+            rows = candidates[np.isin(keys[candidates], selected)]
+
+        # Até ``group_size`` pontos por grupo: ordena por (grupo, score) e corta pela posição no grupo
+        group_of = np.searchsorted(values, keys[rows])
+        order = np.lexsort((np.arange(len(rows)), group_of))
+        position = np.arange(len(rows)) - np.searchsorted(group_of[order], group_of[order])
+        rows = rows[order][position < group_size]
+
+        # Só os pontos devolvidos têm o payload decodificado
+        hits: Dict[str, List[ScoredPoint]] = {value: [] for value in selected}
+        group_ids: Dict[str, Any] = {}
+        for row in rows:
+            record = collection.record(row)
+            key = str(keys[row])
+            group_ids.setdefault(key, record["payload"].get(group_by))
+            hits[key].append(
+                ScoredPoint(
+                    id=record["id"],
+                    version=0,
+                    score=float(all_scores[row]),
+                    payload=self._select_payload(record["payload"], with_payload),
+                )
+            )
+        return GroupsResult(groups=[PointGroup(id=group_ids[key], hits=hits[key]) for key in hits])
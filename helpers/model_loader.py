@@ -1,5 +1,9 @@
 import os
-from qdrant_client import QdrantClient
+import time
+import asyncio
+import inspect
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
 from llama_cpp import Llama
 from huggingface_hub import hf_hub_download
 from dotenv import load_dotenv
@@ -37,15 +41,132 @@ def load_model() -> Llama:
     )
 
 
-def load_qdrant_client() -> QdrantClient:
+# Conexão com o servidor Qdrant (QDRANT_BACKEND=http)
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() in ("1", "true", "yes")
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+# Timeout por requisição (s), conexões HTTP mantidas no pool e política de retry
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "10"))
+QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", "16"))
+QDRANT_RETRIES = int(os.getenv("QDRANT_RETRIES", "2"))
+QDRANT_RETRY_BACKOFF = float(os.getenv("QDRANT_RETRY_BACKOFF", "0.2"))
+
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+
+def _is_transient(error: Exception) -> bool:
+    """Erros de rede/timeout e respostas 429/5xx de gateway; o resto sobe na hora."""
+    if isinstance(error, ResponseHandlingException):
+        return True
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code in RETRYABLE_STATUS
+    try:
+        import grpc
+    except ImportError:
+        return False
+    return isinstance(error, grpc.RpcError) and error.code() in (
+        grpc.StatusCode.UNAVAILABLE,
+        grpc.StatusCode.DEADLINE_EXCEEDED,
+        grpc.StatusCode.RESOURCE_EXHAUSTED,
+    )
+
+
+class RetryingQdrantClient:
+    """
+    Envolve um ``QdrantClient`` / ``AsyncQdrantClient`` repetindo as chamadas
+    que falham com erros transitórios, com backoff exponencial.
+    """
+
+    def __init__(self, client, retries: int = QDRANT_RETRIES, backoff: float = QDRANT_RETRY_BACKOFF):
+        self._client = client
+        self._retries = retries
+        self._backoff = backoff
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        if inspect.iscoroutinefunction(attr):
+            async def async_call(*args, **kwargs):
+                for attempt in range(self._retries + 1):
+                    try:
+                        return await attr(*args, **kwargs)
+                    except Exception as error:
+                        if attempt == self._retries or not _is_transient(error):
+                            raise
+                        print(f"🔁 Qdrant {name} failed ({error!r}), retry {attempt + 1}/{self._retries}")
+                        await asyncio.sleep(self._backoff * 2 ** attempt)
+
+            return async_call
+
+        def call(*args, **kwargs):
+            for attempt in range(self._retries + 1):
+                try:
+                    return attr(*args, **kwargs)
+                except Exception as error:
+                    if attempt == self._retries or not _is_transient(error):
+                        raise
+                    print(f"🔁 Qdrant {name} failed ({error!r}), retry {attempt + 1}/{self._retries}")
+                    time.sleep(self._backoff * 2 ** attempt)
+
+        return call
+
+
+def _server_kwargs(prefer_grpc: bool = None) -> dict:
     """
-    Cria e retorna um cliente conectado ao Qdrant.
-    Exemplo sem autenticação:
+    Argumentos de conexão com o servidor. Em HTTP o pool do httpx é limitado a
+    QDRANT_POOL_SIZE conexões keep-alive; em gRPC as requisições são
+    multiplexadas em um único canal HTTP/2.
     """
+    import httpx
+
     # Se tiver QDRANT_API_KEY ou QDRANT_URL no .env, use:
     host = os.getenv("QDRANT_HOST", "qdrant.filipelopes.me")
     port = os.getenv("QDRANT_PORT", "80")
-    return QdrantClient(host=host, port=int(port), prefer_grpc=False)
+    return {
+        "host": host,
+        "port": int(port),
+        "grpc_port": QDRANT_GRPC_PORT,
+        "prefer_grpc": QDRANT_PREFER_GRPC if prefer_grpc is None else prefer_grpc,
+        "timeout": QDRANT_TIMEOUT,
+        "limits": httpx.Limits(
+            max_connections=QDRANT_POOL_SIZE,
+            max_keepalive_connections=QDRANT_POOL_SIZE,
+        ),
+    }
+
+
+def load_qdrant_client(prefer_grpc: bool = None):
+    """
+    Cria e retorna o backend de busca vetorial usado pelos tools.
+    QDRANT_BACKEND seleciona:
+    - "http" (padrão): servidor Qdrant remoto em QDRANT_HOST:QDRANT_PORT
+      (gRPC em QDRANT_GRPC_PORT com QDRANT_PREFER_GRPC=true), com retry
+    - "local": Qdrant embarcado (modo path) em QDRANT_LOCAL_PATH
+    - "numpy": índice NumPy memory-mapped em LOCAL_INDEX_PATH (helpers/local_index.py)
+    """
+    backend = os.getenv("QDRANT_BACKEND", "http")
+    if backend == "local":
+        return QdrantClient(path=os.getenv("QDRANT_LOCAL_PATH", "./qdrant_local"))
+    if backend == "numpy":
+        from helpers.local_index import LocalVectorIndex
+
+        return LocalVectorIndex(os.getenv("LOCAL_INDEX_PATH", "./local_index"))
+
+    return RetryingQdrantClient(QdrantClient(**_server_kwargs(prefer_grpc)))
+
+
+def load_async_qdrant_client(prefer_grpc: bool = None):
+    """
+    Versão ``AsyncQdrantClient`` de ``load_qdrant_client``, usada pelos tools
+    quando o grafo roda de forma assíncrona (servidor LangGraph).
+    Retorna None nos backends embarcados: o índice NumPy só tem interface
+    síncrona e o Qdrant em modo path trava o diretório para um único cliente.
+    """
+    if os.getenv("QDRANT_BACKEND", "http") != "http":
+        return None
+
+    return RetryingQdrantClient(AsyncQdrantClient(**_server_kwargs(prefer_grpc)))
 
 if __name__ == "__main__":
     model = load_model()
@@ -1,13 +1,43 @@
 import os
+import re
+import sys
 import time
 import json
+import uuid
+import queue
+import hashlib
+import argparse
+import threading
+from collections import Counter, defaultdict
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, NamedTuple
 import gdown
 from sentence_transformers import SentenceTransformer
 from qdrant_client import QdrantClient
-from qdrant_client.models import PointStruct, VectorParams, Distance
+from qdrant_client.models import Batch, PointIdsList
 from tqdm import tqdm
+import numpy as np
 import torch
 
+# Permite rodar como `python helpers/populate_qdrant.py` a partir da raiz do repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from helpers.icd11_catalog import ICD11Catalog, CATALOG_PATH, iter_json_items
+from helpers.encoders import ProcessPoolEncoder
+from helpers.local_index import LocalIndexWriter
+from helpers.qdrant_config import (
+    DEFAULT_KEEP_VERSIONS,
+    PROFILES,
+    STORAGE_OPTIONS,
+    active_collection,
+    bulk_load_optimizers,
+    create_collection,
+    new_version,
+    publish_version,
+    vector_params,
+    versioned_name,
+)
+
 # URL to the JSON data on Google Drive
 JSON_URL = "https://drive.google.com/uc?id=1W-F3bXcgQ34djSBCoSfwClDxRSTSSEml"
 JSON_PATH = "icd11_vector_input.json"
@@ -15,6 +45,11 @@ JSON_PATH = "icd11_vector_input.json"
 QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
 QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
 BATCH_SIZE = 64
+# Lotes em voo entre as etapas (leitura -> encode -> upload)
+QUEUE_BATCHES = 8
+UPLOAD_WORKERS = 4
+# Namespace dos IDs uuid5 dos pontos
+POINT_NAMESPACE = uuid.UUID("6f0c1d52-3b1e-4c8e-9a57-1c6e2f0b8d11")
 
 model_infos = [
     ("sentence-transformers/all-MiniLM-L6-v2", "icd11_concepts_minilm"),
@@ -35,82 +70,685 @@ def download_json():
     return JSON_PATH
 
 
-def generate_points(data):
-    points = []
-    for item in data:
-        points.append(
-            (
-                item["concept_name"],
-                {"concept_name": item["concept_name"], **item["metadata"]},
-            )
-        )
+def fsn_tokens(text):
+    # Mesma normalização do ExactMatchStemCodeTool: sem pontuação, minúsculo, tokens únicos
+    return sorted(set(re.sub(r"[^\w\s]", "", text.strip()).lower().split()))
+
+
+def generate_points(json_path, fsn_by_code):
+    # Lê o JSON em streaming e gera (texto, payload) de cada ponto
+    for item in iter_json_items(json_path):
+        payload = {"concept_name": item["concept_name"], **item["metadata"]}
+        fsn = fsn_by_code.get(item["metadata"].get("code"))
+        if fsn is not None:
+            payload["fsn"] = fsn
+            payload["fsn_tokens"] = fsn_tokens(fsn)
+        yield item["concept_name"], payload
         for option in item["metadata"].get("postcoordination_options", []):
-            points.append(
-                (
-                    option["title"],
-                    {
-                        "concept_name": item["concept_name"],
-                        "parent_code": item["metadata"]["code"],
-                        "postcoordination_title": option["title"],
-                        **option,
-                    },
-                )
+            yield (
+                option["title"],
+                {
+                    "concept_name": item["concept_name"],
+                    "parent_code": item["metadata"]["code"],
+                    "postcoordination_title": option["title"],
+                    **option,
+                },
             )
+
+
+def vector_name(collection_name):
+    # "icd11_concepts_mpnet" -> "mpnet", o mesmo nome usado pelo V3 (Collection.vector_name)
+    return collection_name.rsplit("_", 1)[-1]
+
+
+def point_id(text, payload):
+    # ID determinístico: o mesmo ponto mantém o ID entre execuções
+    if "parent_code" in payload:
+        # Pós-coordenação: a mesma opção (lateralidade, gravidade...) aparece em
+        # muitos stems, então a chave inclui o stem de origem
+        key = f"{payload['parent_code']}|postcoordination|{payload.get('code', '')}|{text}"
+    else:
+        key = f"{payload.get('code', '')}|{payload.get('name_type', '')}|{text}"
+    return str(uuid.uuid5(POINT_NAMESPACE, key))
+
+
+def point_label(text, payload):
+    if "parent_code" in payload:
+        return f"{payload['parent_code']} > {payload.get('code') or '?'} | {text}"
+    return f"{payload.get('code', '?')} | {text}"
+
+
+def content_hash(text, payload, model_key):
+    # Muda se o texto, o payload ou o(s) encoder(s) mudarem
+    content = json.dumps([model_key, text, payload], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def keyed_points(json_path, fsn_by_code, report=True, sample=5):
+    """
+    Gera (id, texto, payload). Entradas com o mesmo ID (mesmo código, tipo e
+    texto) ficam com a primeira; com ``report`` as descartadas são contadas e
+    reportadas no fim.
+    """
+    seen = set()
+    dropped = Counter()
+    for text, payload in generate_points(json_path, fsn_by_code):
+        pid = point_id(text, payload)
+        if pid in seen:
+            dropped[point_label(text, payload)] += 1
+            continue
+        seen.add(pid)
+        yield pid, text, payload
+    if dropped and report:
+        print(f"⚠️ Dropped {sum(dropped.values())} duplicate points (same code, type and text):")
+        for label, count in dropped.most_common(sample):
+            print(f"   = {label} (x{count})")
+
+
+class PointInfo(NamedTuple):
+    content_hash: str
+    label: str
+    text: str
+
+
+def scan_points(json_path, fsn_by_code, model_keys):
+    """
+    Uma única leitura do JSON para todas as coleções: ``model_keys`` é
+    coleção -> model_key; devolve coleção -> {id: PointInfo}, com o hash de
+    conteúdo de cada coleção (sem manter os payloads em memória).
+    """
+    points = {name: {} for name in model_keys}
+    for pid, text, payload in keyed_points(json_path, fsn_by_code):
+        label = point_label(text, payload)
+        for name, model_key in model_keys.items():
+            points[name][pid] = PointInfo(content_hash(text, payload, model_key), label, text)
     return points
 
 
-if __name__ == "__main__":
-    json_path = download_json()
-    with open(json_path, "r") as f:
-        data = json.load(f)
+def stream_points(json_path, fsn_by_code, points, ids):
+    """Relê o JSON em streaming com os pontos de ``ids`` e o content_hash já calculado."""
+    for pid, text, payload in keyed_points(json_path, fsn_by_code, report=False):
+        if pid in ids:
+            yield pid, text, {**payload, "content_hash": points[pid].content_hash}
 
-    all_points = generate_points(data)
 
-    for model_name, collection_name in model_infos:
-        print(f"\n--- Starting for {model_name} -> {collection_name} ---")
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        model = SentenceTransformer(model_name, device=device)
-        client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+def text_counts(points, ids):
+    """texto -> quantos dos pontos em ``ids`` usam esse texto."""
+    return Counter(points[pid].text for pid in ids)
 
-        if client.collection_exists(collection_name=collection_name):
-            client.delete_collection(collection_name=collection_name)
 
-        client.create_collection(
+def existing_points(client, collection_name):
+    """id (str) -> (id original, payload resumido) de todos os pontos já gravados."""
+    existing = {}
+    offset = None
+    while True:
+        records, offset = client.scroll(
             collection_name=collection_name,
-            vectors_config=VectorParams(
-                size=model.get_sentence_embedding_dimension(),
-                distance=Distance.COSINE,
-            ),
+            limit=10_000,
+            offset=offset,
+            with_payload=["content_hash", "code", "parent_code", "concept_name", "postcoordination_title"],
+            with_vectors=False,
         )
+        for record in records:
+            existing[str(record.id)] = (record.id, record.payload or {})
+        if offset is None:
+            return existing
+
+
+class SyncPlan(NamedTuple):
+    new: List[str]
+    changed: List[str]
+    deleted: List[Any]
+    unchanged: int
+
+    @property
+    def upsert(self):
+        return self.new + self.changed
+
+
+def plan_sync(points, existing):
+    new, changed = [], []
+    for pid, info in points.items():
+        if pid not in existing:
+            new.append(pid)
+        elif existing[pid][1].get("content_hash") != info.content_hash:
+            changed.append(pid)
+    deleted = [raw_id for pid, (raw_id, _) in existing.items() if pid not in points]
+    return SyncPlan(new, changed, deleted, len(points) - len(new) - len(changed))
+
+
+def print_sync_report(collection_name, plan, points, existing, sample=10):
+    print(
+        f"🧮 [{collection_name}] new={len(plan.new)} changed={len(plan.changed)} "
+        f"deleted={len(plan.deleted)} unchanged={plan.unchanged}"
+    )
+
+    for label, pids in (("+", plan.new), ("~", plan.changed)):
+        for pid in pids[:sample]:
+            print(f"   {label} {points[pid].label}")
+        if len(pids) > sample:
+            print(f"   {label} ... {len(pids) - sample} more")
+    removed = {str(raw_id) for raw_id in plan.deleted}
+    for pid in list(removed)[:sample]:
+        payload = existing[pid][1]
+        print(f"   - {point_label(payload.get('postcoordination_title') or payload.get('concept_name', ''), payload)}")
+    if len(removed) > sample:
+        print(f"   - ... {len(removed) - sample} more")
+
+
+def prepare_collection(client, collection_name, points, rebuild, dry_run, version):
+    """
+    Compara os pontos desejados com os da coleção servida pelo alias
+    ``collection_name`` e devolve o plano de sync e a coleção onde gravar.
+    Sem coleção ativa (ou com --rebuild) a carga completa vai para uma nova
+    versão (``<alias>__<versão>``), publicada no alias só no fim.
+    """
+    active = active_collection(client, collection_name) if client is not None else None
+    synced = active is not None and not rebuild
+    existing = existing_points(client, active) if synced else {}
+    plan = plan_sync(points, existing)
+    target = active if synced else versioned_name(collection_name, version)
+    if dry_run and client is not None and not synced:
+        print(f"🧱 [{collection_name}] would be built as {target} and then published behind the alias")
+    print_sync_report(collection_name, plan, points, existing)
+    return plan, target, synced
+
+
+def publish_collection(client, collection_name, target, keep):
+    """Troca o alias para a versão recém-carregada e apaga as versões além de ``keep``."""
+    previous, dropped = publish_version(client, collection_name, target, keep)
+    print(f"🔀 [{collection_name}] Alias now serves {target} (previous: {previous or 'none'})")
+    for name in dropped:
+        print(f"🗑️ [{collection_name}] Dropped old version {name}")
+
+
+def delete_points(client, collection_name, ids):
+    for offset in range(0, len(ids), 1_000):
+        client.delete(
+            collection_name=collection_name,
+            points_selector=PointIdsList(points=ids[offset:offset + 1_000]),
+        )
+    if ids:
+        print(f"🗑️ [{collection_name}] Deleted {len(ids)} removed points.")
+
+
+class StageStats:
+    """Pontos e tempo ocupado por etapa do pipeline (compartilhado entre threads)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.points = defaultdict(int)
+        self.seconds = defaultdict(float)
+
+    def add(self, stage, points, seconds):
+        with self._lock:
+            self.points[stage] += points
+            self.seconds[stage] += seconds
+
+    def report(self, collection_name, wall_seconds, workers):
+        parts = []
+        for stage in ("read", "encode", "upload"):
+            if self.points[stage]:
+                rate = self.points[stage] / max(self.seconds[stage], 1e-9)
+                suffix = f"/worker x{workers}" if stage == "upload" else ""
+                parts.append(f"{stage}={rate:.0f} pts/s{suffix}")
+        total = self.points["encode"] / max(wall_seconds, 1e-9)
+        print(f"📈 [{collection_name}] {' '.join(parts)} | end-to-end={total:.0f} pts/s")
+
+
+class DedupEncoder:
+    """
+    Encoda cada texto distinto uma única vez: dentro do lote, os repetidos saem
+    de um único encode; entre lotes, o vetor de um texto que ainda vai aparecer
+    fica guardado até o último ponto que o usa (contagem de ``counts``), então
+    só os textos repetidos ocupam memória.
+    """
+
+    def __init__(self, encode, counts):
+        self._encode = encode
+        self.remaining = Counter(counts)
+        self.cache = {}
+        self.requested = 0
+        self.encoded = 0
+        self.seconds = 0.0
+
+    def __call__(self, texts):
+        missing = [text for text in dict.fromkeys(texts) if text not in self.cache]
+        fresh = {}
+        if missing:
+            started = time.perf_counter()
+            vectors = self._encode(missing)
+            self.seconds += time.perf_counter() - started
+            for i, text in enumerate(missing):
+                fresh[text] = {name: v[i] for name, v in vectors.items()} if isinstance(vectors, dict) else vectors[i]
+        self.requested += len(texts)
+        self.encoded += len(missing)
+
+        rows = []
+        for text in texts:
+            row = self.cache.get(text)
+            if row is None:
+                row = fresh[text]
+            rows.append(row)
+            self.remaining[text] -= 1
+            if self.remaining[text] > 0:
+                self.cache[text] = row
+            else:
+                self.cache.pop(text, None)
+        if isinstance(rows[0], dict):
+            return {name: np.stack([row[name] for row in rows]) for name in rows[0]}
+        return np.stack(rows)
+
+    def report(self, collection_name):
+        if not self.requested:
+            return
+        saved = (self.requested - self.encoded) * self.seconds / max(self.encoded, 1)
+        print(
+            f"🔁 [{collection_name}] Dedupe: {self.requested} points -> {self.encoded} distinct texts encoded "
+            f"({self.requested / max(self.encoded, 1):.2f}x), ~{saved:.1f} seconds of encoding saved"
+        )
+
+
+def as_lists(vectors):
+    # Uma conversão por lote (C), sem laço Python por vetor
+    if isinstance(vectors, dict):
+        return {name: v.tolist() for name, v in vectors.items()}
+    return vectors.tolist()
 
-        for field in ["code", "code_type", "name_type", "is_leaf"]:
-            client.create_payload_index(
-                collection_name=collection_name,
-                field_name=field,
-                field_schema="keyword" if field != "is_leaf" else "bool",
-            )
 
-        start = time.time()
-        batch_texts, batch_payload, batch_ids = [], [], []
-        for idx, (text, payload) in enumerate(
-            tqdm(all_points, desc=f"Vectorizing [{collection_name}]")
-        ):
-            batch_texts.append(text)
-            batch_payload.append(payload)
-            batch_ids.append(idx)
-
-            if len(batch_texts) >= BATCH_SIZE or idx == len(all_points) - 1:
-                vectors = model.encode(
-                    batch_texts, batch_size=BATCH_SIZE, show_progress_bar=False
+def run_pipeline(
+    client, collection_name, points, encode, upsert_ids, local_writer, workers, total, batch_size=BATCH_SIZE
+):
+    """
+    Leitura -> encode -> upload com filas limitadas entre as etapas:
+    uma thread lê e agrupa os pontos, a thread principal encoda (e alimenta o
+    índice local) e ``workers`` threads fazem os upserts em paralelo.
+    """
+    stats = StageStats()
+    read_queue = queue.Queue(maxsize=QUEUE_BATCHES)
+    upload_queue = queue.Queue(maxsize=QUEUE_BATCHES)
+    errors = []
+
+    def reader():
+        try:
+            batch, started = [], time.perf_counter()
+            for point in points:
+                batch.append(point)
+                if len(batch) >= batch_size:
+                    stats.add("read", len(batch), time.perf_counter() - started)
+                    read_queue.put(batch)
+                    batch, started = [], time.perf_counter()
+            if batch:
+                stats.add("read", len(batch), time.perf_counter() - started)
+                read_queue.put(batch)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            read_queue.put(None)
+
+    def uploader():
+        while True:
+            item = upload_queue.get()
+            if item is None:
+                return
+            if errors:
+                continue  # só drena a fila para não travar o encoder
+            ids, vectors, payloads = item
+            started = time.perf_counter()
+            try:
+                client.upsert(
+                    collection_name=collection_name,
+                    points=Batch(ids=ids, vectors=as_lists(vectors), payloads=payloads),
                 )
-                points = [
-                    PointStruct(id=batch_ids[i], vector=vectors[i].tolist(), payload=batch_payload[i])
-                    for i in range(len(batch_texts))
-                ]
-                client.upsert(collection_name=collection_name, points=points)
-                batch_texts, batch_payload, batch_ids = [], [], []
-
-        duration = time.time() - start
-        print(f"✅ [{collection_name}] Inserted {len(all_points)} points in {duration:.2f} seconds.")
+            except Exception as error:
+                errors.append(error)
+                continue
+            stats.add("upload", len(ids), time.perf_counter() - started)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=reader, daemon=True)]
+    threads += [threading.Thread(target=uploader, daemon=True) for _ in range(workers if upsert_ids else 0)]
+    for thread in threads:
+        thread.start()
+
+    progress = tqdm(total=total, desc=f"Vectorizing [{collection_name}]")
+    while True:
+        batch = read_queue.get()
+        if batch is None or errors:
+            break
+        ids = [pid for pid, _, _ in batch]
+        payloads = [payload for _, _, payload in batch]
+        started = time.perf_counter()
+        vectors = encode([text for _, text, _ in batch])
+        stats.add("encode", len(batch), time.perf_counter() - started)
+        if local_writer is not None:
+            local_writer.add(ids, vectors, payloads)
+
+        keep = [i for i, pid in enumerate(ids) if pid in upsert_ids]
+        if keep:
+            if len(keep) < len(ids):
+                vectors = (
+                    {name: v[keep] for name, v in vectors.items()} if isinstance(vectors, dict) else vectors[keep]
+                )
+            upload_queue.put(([ids[i] for i in keep], vectors, [payloads[i] for i in keep]))
+        progress.update(len(batch))
+    progress.close()
+
+    for _ in threads[1:]:
+        upload_queue.put(None)
+    for thread in threads[1:]:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+    stats.report(collection_name, time.perf_counter() - start, workers)
+    return stats
+
+
+def verify_pool_encoding(collection_name, models, pools, points):
+    """Compara o encode multi-processo com o de processo único (mesmos lotes) numa amostra."""
+    texts = [info.text for info in islice(points.values(), BATCH_SIZE * 4)]
+    for name, model in models.items():
+        single = np.concatenate([
+            model.encode(texts[i:i + BATCH_SIZE], batch_size=BATCH_SIZE, show_progress_bar=False, convert_to_numpy=True)
+            for i in range(0, len(texts), BATCH_SIZE)
+        ])
+        pooled = pools[name].encode(texts)
+        print(
+            f"🔬 [{collection_name}:{name}] pool vs single process on {len(texts)} texts: "
+            f"identical={np.array_equal(single, pooled)} max|Δ|={np.abs(single - pooled).max():.2e}"
+        )
+
+
+def collection_model_key(model_names, named_vectors=False):
+    return list(model_names.values()) if named_vectors else next(iter(model_names.values()))
+
+
+def populate_collection(
+    client, collection_name, model_names, json_path, fsn_by_code, points, args, named_vectors=False
+):
+    """
+    Sincroniza uma coleção com o JSON: ``model_names`` é nome do vetor -> modelo;
+    com ``named_vectors`` a coleção tem um named vector por encoder (multi-vetor).
+    ``points`` vem de ``scan_points`` (id -> PointInfo da coleção).
+    """
+    model_key = collection_model_key(model_names, named_vectors)
+    plan, target, synced = prepare_collection(
+        client, collection_name, points, args.rebuild, args.dry_run, args.index_version
+    )
+    if args.dry_run:
+        return
+
+    # O índice local é reescrito inteiro: com ele, todos os pontos são encodados
+    local_index = args.local_index and not named_vectors
+    encode_ids = set(points) if local_index else set(plan.upsert)
+    upsert_ids = set(plan.upsert) if client is not None else set()
+    if not encode_ids and synced:
+        delete_points(client, target, plan.deleted)
+        print(f"✅ [{collection_name}] Already up to date.")
+        return
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    models = {name: SentenceTransformer(uri, device=device) for name, uri in model_names.items()}
+    dims = {name: model.get_sentence_embedding_dimension() for name, model in models.items()}
+
+    # Encode multi-processo: um pool por modelo, com os núcleos divididos entre
+    # todos os pools em uso (modelos concorrentes incluídos)
+    processes = args.processes_per_model
+    pools = {}
+    if processes:
+        threads = max(1, (os.cpu_count() or 1) // (processes * args.concurrent_pools))
+        pools = {
+            name: ProcessPoolEncoder(model, processes, threads, BATCH_SIZE) for name, model in models.items()
+        }
+        print(f"🧵 [{collection_name}] Encoding with {processes} processes x {threads} threads per model")
+
+    def encode_with(name, texts):
+        if name in pools:
+            return pools[name].encode(texts)
+        return models[name].encode(texts, batch_size=BATCH_SIZE, show_progress_bar=False, convert_to_numpy=True)
+
+    model_threads = None
+    if named_vectors:
+        # Com pools, os encoders de cada named vector rodam ao mesmo tempo
+        model_threads = ThreadPoolExecutor(max_workers=len(models)) if pools else None
+
+        def encode(texts):
+            if model_threads is None:
+                return {name: encode_with(name, texts) for name in models}
+            return dict(zip(models, model_threads.map(lambda name: encode_with(name, texts), models)))
+    else:
+        (name,) = models
+
+        def encode(texts):
+            return encode_with(name, texts)
+
+    if pools and args.verify_encoding:
+        verify_pool_encoding(collection_name, models, pools, points)
+
+    # Títulos de pós-coordenação (lateralidade, gravidade...) se repetem em
+    # milhares de stems: cada texto distinto é encodado uma vez por modelo
+    dedup = DedupEncoder(encode, text_counts(points, encode_ids))
+
+    if client is not None and not synced:
+        vectors_config = {name: vector_params(dim, args.storage, args.profile) for name, dim in dims.items()}
+        create_collection(
+            client,
+            target,
+            vectors_config if named_vectors else next(iter(vectors_config.values())),
+            args.profile,
+        )
+
+    local_writer = (
+        LocalIndexWriter(args.local_index, collection_name, next(iter(dims.values())))
+        if local_index
+        else None
+    )
+
+    bulk = args.bulk_load and client is not None and bool(upsert_ids)
+    if bulk:
+        print(f"⏸️ [{collection_name}] Bulk load: HNSW indexing paused during upload")
+        client.update_collection(collection_name=target, optimizers_config=bulk_load_optimizers(True))
+    start = time.time()
+    try:
+        run_pipeline(
+            client,
+            target,
+            stream_points(json_path, fsn_by_code, points, encode_ids),
+            dedup,
+            upsert_ids,
+            local_writer,
+            args.upload_workers,
+            len(encode_ids),
+            BATCH_SIZE * max(1, processes) * 2,
+        )
+    except BaseException:
+        # Versão nova incompleta nunca chega ao alias: descarta
+        if client is not None and not synced:
+            client.delete_collection(collection_name=target)
+        raise
+    finally:
+        for pool in pools.values():
+            pool.close()
+        if model_threads is not None:
+            model_threads.shutdown()
+        if bulk and client.collection_exists(collection_name=target):
+            client.update_collection(collection_name=target, optimizers_config=bulk_load_optimizers(False))
+            print(f"▶️ [{collection_name}] Indexing re-enabled, Qdrant builds the HNSW graph in the background")
+
+    if client is not None:
+        delete_points(client, target, plan.deleted)
+        if not synced:
+            publish_collection(client, collection_name, target, args.keep_versions)
+    if local_writer is not None:
+        local_writer.close(model=model_key)
+    dedup.report(collection_name)
+
+    duration = time.time() - start
+    print(
+        f"✅ [{collection_name}] Encoded {len(encode_ids)} and upserted {len(upsert_ids)} "
+        f"of {len(points)} points in {duration:.2f} seconds."
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Populate the ICD-11 vector collections")
+    parser.add_argument(
+        "--qdrant-path",
+        help="Write to an embedded Qdrant (local/path mode) instead of QDRANT_HOST:QDRANT_PORT",
+    )
+    parser.add_argument(
+        "--local-index",
+        help="Also write a memory-mapped NumPy index (helpers/local_index.py) to this directory",
+    )
+    parser.add_argument(
+        "--multivector",
+        metavar="COLLECTION",
+        help="Build a single collection with one named vector per encoder (e.g. icd11_concepts_multi) "
+        "instead of one collection per encoder",
+    )
+    parser.add_argument(
+        "--storage",
+        choices=STORAGE_OPTIONS,
+        default="float32",
+        help="Vector storage: float32, float16, or int8/binary quantization with the originals kept for rescoring",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=tuple(PROFILES),
+        default="default",
+        help="Collection profile: HNSW m/ef_construct and on-disk vectors/graph/payload "
+        "(set the same QDRANT_PROFILE in V3)",
+    )
+    parser.add_argument(
+        "--collection-suffix",
+        default="",
+        help="Suffix appended to every collection name (e.g. _int8) to build a variant next to the float32 one",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report which points would be added, updated or deleted in each collection",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Build new versions of the collections instead of syncing them (needed to change --storage/--profile)",
+    )
+    parser.add_argument(
+        "--keep-versions",
+        type=int,
+        default=DEFAULT_KEEP_VERSIONS,
+        help="Previous collection versions kept for rollback after the alias switches to a new one",
+    )
+    parser.add_argument(
+        "--bulk-load",
+        action="store_true",
+        help="Pause HNSW indexing while uploading and re-enable it at the end (faster large loads)",
+    )
+    parser.add_argument(
+        "--upload-workers",
+        type=int,
+        default=UPLOAD_WORKERS,
+        help="Parallel upsert threads overlapping with encoding",
+    )
+    parser.add_argument(
+        "--encode-processes",
+        type=int,
+        default=0,
+        help="Encode with a CPU process pool of this many workers (0 = single process, -1 = one per core); "
+        "split between the models with --concurrent-models",
+    )
+    parser.add_argument(
+        "--concurrent-models",
+        action="store_true",
+        help="Populate the per-encoder collections at the same time (each with its share of the processes)",
+    )
+    parser.add_argument(
+        "--verify-encoding",
+        action="store_true",
+        help="Compare the process-pool embeddings with the single-process ones on a sample before loading",
+    )
+    parser.add_argument(
+        "--skip-qdrant",
+        action="store_true",
+        help="Only build the local NumPy index",
+    )
+    args = parser.parse_args()
+    # Mesma versão para todas as coleções construídas nesta execução
+    args.index_version = new_version()
+    if args.encode_processes < 0:
+        args.encode_processes = os.cpu_count() or 1
+    # Pools simultâneos: um por modelo no multi-vetor ou com --concurrent-models
+    args.concurrent_pools = len(model_infos) if args.multivector or args.concurrent_models else 1
+    args.processes_per_model = (
+        max(1, args.encode_processes // args.concurrent_pools) if args.encode_processes else 0
+    )
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    json_path = download_json()
+
+    # 1ª leitura: catálogo de lookups por código, que também dá o FSN de cada código
+    catalog = ICD11Catalog.from_json(json_path)
+    if not args.dry_run:
+        catalog.save(CATALOG_PATH)
+        print(f"📚 ICD-11 catalog written to {CATALOG_PATH}: {ICD11Catalog.load(CATALOG_PATH).stats()}")
+    fsn_by_code = catalog.fsn_index()
+
+    client = None
+    if not args.skip_qdrant:
+        if args.qdrant_path:
+            client = QdrantClient(path=args.qdrant_path)
+        else:
+            client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+
+    # Coleção -> (named vector -> modelo, multi-vetor?)
+    if args.multivector:
+        collections = {
+            args.multivector + args.collection_suffix: (
+                {vector_name(name): model_name for model_name, name in model_infos},
+                True,
+            )
+        }
+    else:
+        collections = {
+            name + args.collection_suffix: ({vector_name(name): model_name}, False) for model_name, name in model_infos
+        }
+
+    # 2ª leitura: IDs, hashes de conteúdo e textos de todas as coleções de uma vez;
+    # depois cada coleção só relê o JSON em streaming para encodar e subir os pontos
+    started = time.time()
+    points_by_collection = scan_points(
+        json_path,
+        fsn_by_code,
+        {name: collection_model_key(models, named) for name, (models, named) in collections.items()},
+    )
+    print(f"🔎 Scanned {len(next(iter(points_by_collection.values())))} points in {time.time() - started:.2f} seconds")
+
+    def populate(collection_name):
+        model_names, named_vectors = collections[collection_name]
+        label = "multi-vector collection" if named_vectors else next(iter(model_names.values()))
+        print(f"\n--- Starting for {label} -> {collection_name} [{args.storage}, {args.profile}] ---")
+        populate_collection(
+            client,
+            collection_name,
+            model_names,
+            json_path,
+            fsn_by_code,
+            points_by_collection[collection_name],
+            args,
+            named_vectors=named_vectors,
+        )
+
+    if args.concurrent_models and len(collections) > 1:
+        with ThreadPoolExecutor(max_workers=len(collections)) as executor:
+            for future in [executor.submit(populate, name) for name in collections]:
+                future.result()
+    else:
+        for collection_name in collections:
+            populate(collection_name)
 
     print("🏁 Completed processing for all collections.")
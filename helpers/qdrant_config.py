@@ -0,0 +1,318 @@
+"""
+Parâmetros de armazenamento das coleções e de busca no Qdrant, compartilhados
+entre o populate (criação das coleções) e os tools do V3 (consultas).
+
+Armazenamento dos vetores (``--storage`` no populate / QDRANT_STORAGE no V3):
+- "float32": vetores originais em float32 (padrão)
+- "float16": vetores em float16 (metade da RAM, sem etapa de rescore)
+- "int8": quantização escalar int8 em RAM (~4x menor), originais usados no rescore
+- "binary": quantização binária em RAM (~32x menor), originais usados no rescore
+
+Nas quantizadas, a busca pega ``limit * oversampling`` candidatos no índice
+quantizado e reordena com os vetores originais (rescore).
+
+Perfis de coleção (``--profile`` no populate / QDRANT_PROFILE no V3) fixam o
+HNSW (``m`` / ``ef_construct``), o armazenamento em disco (mmap) dos vetores,
+do grafo e do payload, e o ``hnsw_ef`` usado nas consultas:
+- "default": padrões do Qdrant
+- "low-latency": tudo em RAM, grafo mais denso e ``hnsw_ef`` baixo
+- "memory-lean": vetores, grafo HNSW e payload em disco (mmap); combinado com
+  int8/binary, só os vetores quantizados ficam em RAM
+- "high-recall": grafo denso e ``hnsw_ef`` alto, em RAM
+
+Blue/green: os tools consultam sempre o nome estável (um alias no Qdrant); as
+cargas completas criam uma coleção versionada (``<alias>__<versão>``) e só
+trocam o alias, numa operação atômica, depois que ela está completa. As
+versões anteriores ficam guardadas para rollback.
+"""
+
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional
+
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    CreateAlias,
+    CreateAliasOperation,
+    Datatype,
+    DeleteAlias,
+    DeleteAliasOperation,
+    Distance,
+    HnswConfigDiff,
+    OptimizersConfigDiff,
+    PointStruct,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+)
+
+STORAGE_OPTIONS = ("float32", "float16", "int8", "binary")
+QUANTIZED_STORAGE = ("int8", "binary")
+# Oversampling padrão: binária perde mais precisão e precisa de mais candidatos
+DEFAULT_OVERSAMPLING = {"int8": 2.0, "binary": 3.0}
+# Bytes por dimensão do que fica em RAM para a busca (estimativa do relatório)
+BYTES_PER_DIMENSION = {"float32": 4.0, "float16": 2.0, "int8": 1.0, "binary": 1 / 8}
+# indexing_threshold padrão do Qdrant (KB de vetores por segmento antes de montar o HNSW)
+DEFAULT_INDEXING_THRESHOLD = 20_000
+# Separador entre o alias estável e a versão: icd11_concepts_mpnet__20250101120000
+VERSION_SEPARATOR = "__"
+# Versões anteriores (além da ativa) mantidas para rollback
+DEFAULT_KEEP_VERSIONS = 2
+# Versão da cópia de uma coleção legada (sem alias): ordena antes de qualquer carga
+LEGACY_VERSION = "00000000000000"
+
+
+class CollectionProfile(NamedTuple):
+    m: Optional[int]
+    ef_construct: Optional[int]
+    on_disk_vectors: bool
+    on_disk_hnsw: bool
+    on_disk_payload: bool
+    hnsw_ef: Optional[int]
+
+
+PROFILES = {
+    "default": CollectionProfile(None, None, False, False, False, None),
+    "low-latency": CollectionProfile(32, 256, False, False, False, 64),
+    "memory-lean": CollectionProfile(16, 128, True, True, True, 64),
+    "high-recall": CollectionProfile(48, 512, False, False, False, 256),
+}
+
+
+def collection_profile(name: str = "default") -> CollectionProfile:
+    if name not in PROFILES:
+        raise ValueError(f"Unknown collection profile '{name}', expected one of {tuple(PROFILES)}")
+    return PROFILES[name]
+
+
+def collection_params(profile: str = "default") -> dict:
+    """Argumentos extras de ``create_collection`` (HNSW e payload em disco) do perfil."""
+    p = collection_profile(profile)
+    return {
+        "hnsw_config": HnswConfigDiff(m=p.m, ef_construct=p.ef_construct, on_disk=p.on_disk_hnsw),
+        "on_disk_payload": p.on_disk_payload,
+    }
+
+
+PAYLOAD_INDEXES = {"code": "keyword", "code_type": "keyword", "name_type": "keyword", "is_leaf": "bool"}
+
+
+def create_collection(client, collection_name, vectors_config, profile="default"):
+    """(Re)cria a coleção com o perfil pedido e os índices de payload usados nos filtros."""
+    if client.collection_exists(collection_name=collection_name):
+        client.delete_collection(collection_name=collection_name)
+
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=vectors_config,
+        **collection_params(profile),
+    )
+
+    for field, schema in PAYLOAD_INDEXES.items():
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field,
+            field_schema=schema,
+        )
+
+
+def vector_params(dim: int, storage: str = "float32", profile: str = "default") -> VectorParams:
+    """``VectorParams`` (COSINE) de uma coleção / named vector para o armazenamento e perfil pedidos."""
+    if storage not in STORAGE_OPTIONS:
+        raise ValueError(f"Unknown vector storage '{storage}', expected one of {STORAGE_OPTIONS}")
+    params = {
+        "size": dim,
+        "distance": Distance.COSINE,
+        "on_disk": collection_profile(profile).on_disk_vectors,
+    }
+    if storage == "float16":
+        params["datatype"] = Datatype.FLOAT16
+    elif storage == "int8":
+        params["quantization_config"] = ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    elif storage == "binary":
+        params["quantization_config"] = BinaryQuantization(
+            binary=BinaryQuantizationConfig(always_ram=True)
+        )
+    return VectorParams(**params)
+
+
+def search_params(
+    storage: str = "float32",
+    oversampling: Optional[float] = None,
+    rescore: bool = True,
+    exact: bool = False,
+    profile: str = "default",
+    hnsw_ef: Optional[int] = None,
+) -> Optional[SearchParams]:
+    """
+    ``SearchParams`` de consulta: ``hnsw_ef`` do perfil (ou o informado) e, para
+    coleções quantizadas, oversampling + rescore. ``exact=True`` faz busca exata
+    nos vetores originais (ground truth).
+    """
+    if exact:
+        return SearchParams(exact=True, quantization=QuantizationSearchParams(ignore=True))
+    hnsw_ef = hnsw_ef or collection_profile(profile).hnsw_ef
+    quantization = None
+    if storage in QUANTIZED_STORAGE:
+        quantization = QuantizationSearchParams(
+            ignore=False,
+            rescore=rescore,
+            oversampling=oversampling or DEFAULT_OVERSAMPLING[storage],
+        )
+    if hnsw_ef is None and quantization is None:
+        return None
+    return SearchParams(hnsw_ef=hnsw_ef, quantization=quantization)
+
+
+def memory_estimate_mb(points: int, dim: int, storage: str = "float32") -> float:
+    """RAM estimada (MB) dos vetores usados na busca, sem o grafo HNSW."""
+    return points * dim * BYTES_PER_DIMENSION[storage] / 1024 / 1024
+
+
+def bulk_load_optimizers(paused: bool) -> OptimizersConfigDiff:
+    """
+    Carga em massa: com ``paused`` o Qdrant não monta o HNSW durante o upload
+    (indexing_threshold=0); ao reativar, indexa tudo de uma vez no fim.
+    """
+    return OptimizersConfigDiff(indexing_threshold=0 if paused else DEFAULT_INDEXING_THRESHOLD)
+
+
+def new_version() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+
+
+def versioned_name(alias: str, version: str) -> str:
+    return f"{alias}{VERSION_SEPARATOR}{version}"
+
+
+def collection_aliases(client) -> dict:
+    """alias -> coleção, de todos os aliases do Qdrant."""
+    return {a.alias_name: a.collection_name for a in client.get_aliases().aliases}
+
+
+def active_collection(client, alias: str) -> Optional[str]:
+    """
+    Coleção servida por ``alias``: a versão para a qual o alias aponta, a
+    coleção legada (sem alias) com o próprio nome, ou None.
+    """
+    target = collection_aliases(client).get(alias)
+    if target is not None:
+        return target
+    if client.collection_exists(collection_name=alias):
+        return alias
+    return None
+
+
+def collection_versions(client, alias: str) -> List[str]:
+    """Coleções versionadas de ``alias``, da mais antiga para a mais nova."""
+    prefix = alias + VERSION_SEPARATOR
+    return sorted(c.name for c in client.get_collections().collections if c.name.startswith(prefix))
+
+
+def copy_collection(client, source: str, target: str, batch_size: int = 256) -> int:
+    """Copia ``source`` (configuração, índices de payload e pontos com vetores) para ``target``."""
+    info = client.get_collection(collection_name=source)
+    config = info.config
+    client.create_collection(
+        collection_name=target,
+        vectors_config=config.params.vectors,
+        on_disk_payload=config.params.on_disk_payload,
+        hnsw_config=HnswConfigDiff(**config.hnsw_config.model_dump()),
+        quantization_config=config.quantization_config,
+    )
+    for field, schema in (info.payload_schema or {}).items():
+        client.create_payload_index(collection_name=target, field_name=field, field_schema=schema.data_type)
+
+    copied, offset = 0, None
+    while True:
+        records, offset = client.scroll(
+            collection_name=source, limit=batch_size, offset=offset, with_payload=True, with_vectors=True
+        )
+        if records:
+            client.upsert(
+                collection_name=target,
+                points=[PointStruct(id=r.id, vector=r.vector, payload=r.payload) for r in records],
+            )
+            copied += len(records)
+        if offset is None:
+            return copied
+
+
+def switch_alias(client, alias: str, collection_name: str) -> Optional[str]:
+    """
+    Aponta ``alias`` para ``collection_name`` (remove + cria na mesma requisição,
+    sem janela sem alias) e devolve a coleção servida antes.
+
+    Uma coleção legada com o nome do alias é antes copiada para uma versão
+    (``<alias>__00000000000000``), então a troca continua reversível com
+    ``rollback_alias``. O Qdrant não cria um alias com o nome de uma coleção
+    existente: a legada só é apagada depois da cópia, imediatamente antes de
+    criar o alias, e se a criação falhar o alias passa a servir a cópia.
+    """
+    previous = active_collection(client, alias)
+    create = CreateAliasOperation(create_alias=CreateAlias(collection_name=collection_name, alias_name=alias))
+    if previous != alias:
+        operations = [create]
+        if previous is not None:
+            operations.insert(0, DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+        client.update_collection_aliases(change_aliases_operations=operations)
+        return previous
+
+    # Migração da coleção legada
+    legacy_copy = versioned_name(alias, LEGACY_VERSION)
+    if client.collection_exists(collection_name=legacy_copy) and (
+        client.count(collection_name=legacy_copy, exact=True).count
+        != client.count(collection_name=alias, exact=True).count
+    ):
+        # Cópia incompleta de uma execução interrompida: refaz
+        client.delete_collection(collection_name=legacy_copy)
+    if not client.collection_exists(collection_name=legacy_copy):
+        try:
+            copied = copy_collection(client, alias, legacy_copy)
+        except BaseException:
+            if client.collection_exists(collection_name=legacy_copy):
+                client.delete_collection(collection_name=legacy_copy)
+            raise
+        print(f"📦 Legacy collection {alias} copied to {legacy_copy} ({copied} points) for rollback")
+    client.delete_collection(collection_name=alias)
+    try:
+        client.update_collection_aliases(change_aliases_operations=[create])
+    except BaseException:
+        client.update_collection_aliases(
+            change_aliases_operations=[
+                CreateAliasOperation(create_alias=CreateAlias(collection_name=legacy_copy, alias_name=alias))
+            ]
+        )
+        raise
+    return legacy_copy
+
+
+def prune_versions(client, alias: str, keep: int = DEFAULT_KEEP_VERSIONS) -> List[str]:
+    """Apaga as versões fora do alias, exceto as ``keep`` mais recentes; devolve as apagadas."""
+    active = active_collection(client, alias)
+    inactive = [name for name in collection_versions(client, alias) if name != active]
+    stale = inactive[:-keep] if keep > 0 else inactive
+    for name in stale:
+        client.delete_collection(collection_name=name)
+    return stale
+
+
+def publish_version(client, alias: str, collection_name: str, keep: int = DEFAULT_KEEP_VERSIONS):
+    """Publica uma versão completa no alias e poda as antigas; devolve (anterior, apagadas)."""
+    previous = switch_alias(client, alias, collection_name)
+    return previous, prune_versions(client, alias, keep)
+
+
+def rollback_alias(client, alias: str) -> str:
+    """Volta o alias para a versão anterior à ativa e devolve o nome dela."""
+    active = active_collection(client, alias)
+    older = [name for name in collection_versions(client, alias) if active is None or name < active]
+    if not older:
+        raise ValueError(f"No previous version of '{alias}' to roll back to")
+    switch_alias(client, alias, older[-1])
+    return older[-1]
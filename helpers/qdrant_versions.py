@@ -0,0 +1,75 @@
+"""
+Versões (blue/green) das coleções servidas por alias: lista a versão ativa e
+as guardadas, volta o alias para a versão anterior ou para uma versão
+específica. A troca é atômica; os tools do V3 passam a ler a nova versão
+assim que o cache da versão ativa expira (INDEX_VERSION_TTL).
+
+Uso:
+    python helpers/qdrant_versions.py list
+    python helpers/qdrant_versions.py rollback --collections icd11_concepts_mpnet
+    python helpers/qdrant_versions.py switch icd11_concepts_mpnet icd11_concepts_mpnet__20250101120000
+"""
+
+import os
+import sys
+import argparse
+
+from qdrant_client import QdrantClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from helpers.qdrant_config import (
+    VERSION_SEPARATOR,
+    active_collection,
+    collection_aliases,
+    collection_versions,
+    rollback_alias,
+    switch_alias,
+)
+
+QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
+QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
+
+
+def stable_names(client):
+    """Aliases existentes + nomes estáveis das coleções versionadas sem alias."""
+    names = set(collection_aliases(client))
+    for collection in client.get_collections().collections:
+        if VERSION_SEPARATOR in collection.name:
+            names.add(collection.name.rsplit(VERSION_SEPARATOR, 1)[0])
+    return sorted(names)
+
+
+def list_versions(client, names):
+    for alias in names:
+        active = active_collection(client, alias)
+        print(f"📚 {alias} -> {active or 'not served'}")
+        for name in collection_versions(client, alias):
+            print(f"   {'*' if name == active else ' '} {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="Show the active and the stored versions of each alias")
+    rollback_parser = commands.add_parser("rollback", help="Point each alias back to its previous version")
+    switch_parser = commands.add_parser("switch", help="Point an alias to a given collection version")
+    switch_parser.add_argument("alias")
+    switch_parser.add_argument("collection")
+    for command in (list_parser, rollback_parser, switch_parser):
+        command.add_argument("--qdrant-path", help="Embedded Qdrant (local/path mode) instead of QDRANT_HOST:QDRANT_PORT")
+    for command in (list_parser, rollback_parser):
+        command.add_argument("--collections", type=lambda v: v.split(","), help="Comma-separated aliases")
+    args = parser.parse_args()
+
+    client = QdrantClient(path=args.qdrant_path) if args.qdrant_path else QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+
+    if args.command == "list":
+        list_versions(client, args.collections or stable_names(client))
+    elif args.command == "rollback":
+        for alias in args.collections or sorted(collection_aliases(client)):
+            print(f"⏪ [{alias}] Alias now serves {rollback_alias(client, alias)}")
+    else:
+        if not client.collection_exists(collection_name=args.collection):
+            parser.error(f"collection not found: {args.collection}")
+        previous = switch_alias(client, args.alias, args.collection)
+        print(f"🔀 [{args.alias}] Alias now serves {args.collection} (previous: {previous or 'none'})")